@@ -0,0 +1,27 @@
+"""Indice composto (date, id) para paginacao por cursor
+
+Revision ID: 3c7e9a41d2f5
+Revises: b1f2626e72d8
+Create Date: 2026-10-18 09:12:40.511203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7e9a41d2f5'
+down_revision: Union[str, Sequence[str], None] = 'b1f2626e72d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_emails_date_id', 'emails', ['date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emails_date_id', table_name='emails')
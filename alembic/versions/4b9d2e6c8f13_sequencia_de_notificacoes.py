@@ -0,0 +1,42 @@
+"""Coluna seq para replay das notificacoes
+
+Revision ID: 4b9d2e6c8f13
+Revises: e7f1c3d95a42
+Create Date: 2026-10-18 15:08:26.402719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b9d2e6c8f13'
+down_revision: Union[str, Sequence[str], None] = 'e7f1c3d95a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE emails_seq")
+    op.add_column('emails', sa.Column('seq', sa.BigInteger(), nullable=True))
+    # histórico numerado na ordem de inserção
+    op.execute("""
+        UPDATE emails SET seq = numbered.seq
+        FROM (
+            SELECT id, date, nextval('emails_seq') AS seq
+            FROM (SELECT id, date FROM emails ORDER BY inserted_at, date, id) ordered
+        ) numbered
+        WHERE emails.id = numbered.id AND emails.date = numbered.date
+    """)
+    op.alter_column('emails', 'seq', nullable=False, server_default=sa.text("nextval('emails_seq')"))
+    op.create_index('ix_emails_seq', 'emails', ['seq'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emails_seq', table_name='emails')
+    op.drop_column('emails', 'seq')
+    op.execute("DROP SEQUENCE emails_seq")
@@ -0,0 +1,45 @@
+"""Rollup de estatisticas por categoria e hora
+
+Revision ID: 6e3b9d1f4a27
+Revises: d2a8f5c7e134
+Create Date: 2026-10-18 19:03:52.774610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3b9d1f4a27'
+down_revision: Union[str, Sequence[str], None] = 'd2a8f5c7e134'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'email_stats_hourly',
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('count', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+        sa.PrimaryKeyConstraint('category', 'bucket'),
+    )
+    op.create_index('ix_email_stats_hourly_bucket', 'email_stats_hourly', ['bucket'], unique=False)
+    # backfill com os e-mails já gravados (os pendentes no outbox entram pelo dispatcher)
+    op.execute(
+        "INSERT INTO email_stats_hourly (category, bucket, count) "
+        "SELECT coalesce(e.category_normalized, ''), date_trunc('hour', e.date, 'UTC'), count(*) "
+        "FROM emails e "
+        "WHERE e.deleted_at IS NULL AND NOT EXISTS ("
+        "SELECT 1 FROM email_outbox o WHERE o.email_id = e.id AND o.email_date = e.date) "
+        "GROUP BY 1, 2"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_stats_hourly_bucket', table_name='email_stats_hourly')
+    op.drop_table('email_stats_hourly')
@@ -0,0 +1,39 @@
+"""Busca full-text em subject e body
+
+Revision ID: 8a2d4f6b1e90
+Revises: 3c7e9a41d2f5
+Create Date: 2026-10-18 10:03:17.284556
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '8a2d4f6b1e90'
+down_revision: Union[str, Sequence[str], None] = '3c7e9a41d2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('emails', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('portuguese', coalesce(subject, '')), 'A') || "
+            "setweight(to_tsvector('portuguese', coalesce(body, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_emails_search_vector', 'emails', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emails_search_vector', table_name='emails', postgresql_using='gin')
+    op.drop_column('emails', 'search_vector')
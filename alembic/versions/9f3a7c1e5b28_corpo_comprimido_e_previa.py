@@ -0,0 +1,50 @@
+"""Corpo comprimido fora da linha e coluna de previa
+
+Revision ID: 9f3a7c1e5b28
+Revises: 4b9d2e6c8f13
+Create Date: 2026-10-18 16:47:09.661832
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f3a7c1e5b28'
+down_revision: Union[str, Sequence[str], None] = '4b9d2e6c8f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREVIEW_EXPR = (
+    r"left(btrim(regexp_replace(regexp_replace(coalesce(body, ''), '<[^>]*>', ' ', 'g'), '\s+', ' ', 'g')), 200)"
+)
+
+PARTITIONS_SQL = (
+    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+    "WHERE i.inhparent = 'emails'::regclass"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # corpos novos comprimidos com lz4 (Postgres 14+)
+    op.execute("ALTER TABLE emails ALTER COLUMN body SET COMPRESSION lz4")
+    # corpos acima de ~256 bytes saem da linha: as listagens leem páginas menores
+    for (partition,) in op.get_bind().execute(sa.text(PARTITIONS_SQL)).all():
+        op.execute(f"ALTER TABLE {partition} SET (toast_tuple_target = 256)")
+    op.add_column('emails', sa.Column(
+        'preview',
+        sa.String(),
+        sa.Computed(PREVIEW_EXPR, persisted=True),
+        nullable=True,
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('emails', 'preview')
+    for (partition,) in op.get_bind().execute(sa.text(PARTITIONS_SQL)).all():
+        op.execute(f"ALTER TABLE {partition} RESET (toast_tuple_target)")
+    op.execute("ALTER TABLE emails ALTER COLUMN body SET COMPRESSION default")
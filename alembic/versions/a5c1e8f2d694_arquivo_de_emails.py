@@ -0,0 +1,47 @@
+"""Tabela de arquivo e indice de removidos
+
+Revision ID: a5c1e8f2d694
+Revises: 6e3b9d1f4a27
+Create Date: 2026-10-18 19:41:17.205583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c1e8f2d694'
+down_revision: Union[str, Sequence[str], None] = '6e3b9d1f4a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'emails_archive',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('body', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('inserted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('seq', sa.BigInteger(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'date'),
+    )
+    op.execute("ALTER TABLE emails_archive ALTER COLUMN body SET COMPRESSION lz4")
+    op.create_index(
+        'ix_emails_deleted_at', 'emails', ['deleted_at'], unique=False,
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_emails_deleted_at', table_name='emails')
+    op.drop_table('emails_archive')
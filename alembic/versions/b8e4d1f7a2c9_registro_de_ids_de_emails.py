@@ -0,0 +1,38 @@
+"""Registro de ids de e-mails (id unico na tabela particionada)
+
+Revision ID: b8e4d1f7a2c9
+Revises: f3b7d2a9c615
+Create Date: 2026-10-18 23:05:12.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4d1f7a2c9'
+down_revision: Union[str, Sequence[str], None] = 'f3b7d2a9c615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'email_ids',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    # ids repetidos gravados antes do registro: a data mais antiga fica como dona
+    op.execute(
+        "INSERT INTO email_ids (id, date) "
+        "SELECT DISTINCT ON (id) id, date FROM emails ORDER BY id, date"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('email_ids')
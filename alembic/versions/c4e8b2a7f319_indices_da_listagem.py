@@ -0,0 +1,54 @@
+"""Indices alinhados com as consultas da listagem
+
+Revision ID: c4e8b2a7f319
+Revises: 8a2d4f6b1e90
+Create Date: 2026-10-18 11:20:05.930417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8b2a7f319'
+down_revision: Union[str, Sequence[str], None] = '8a2d4f6b1e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('emails', sa.Column(
+        'category_normalized',
+        sa.String(),
+        sa.Computed('lower(category)', persisted=True),
+        nullable=True,
+    ))
+    op.create_index(
+        'ix_emails_live_date_id', 'emails',
+        [sa.text('date DESC'), sa.text('id DESC')],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_emails_live_category_date_id', 'emails',
+        ['category_normalized', sa.text('date DESC'), sa.text('id DESC')],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    # substituídos pelos índices acima (ix_emails_id duplicava a chave primária)
+    op.drop_index('ix_emails_date_id', table_name='emails')
+    op.drop_index(op.f('ix_emails_category'), table_name='emails')
+    op.drop_index(op.f('ix_emails_id'), table_name='emails')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_emails_id'), 'emails', ['id'], unique=False)
+    op.create_index(op.f('ix_emails_category'), 'emails', ['category'], unique=False)
+    op.create_index('ix_emails_date_id', 'emails', ['date', 'id'], unique=False)
+    op.drop_index('ix_emails_live_category_date_id', table_name='emails')
+    op.drop_index('ix_emails_live_date_id', table_name='emails')
+    op.drop_column('emails', 'category_normalized')
@@ -0,0 +1,36 @@
+"""Outbox de notificacoes
+
+Revision ID: d2a8f5c7e134
+Revises: 9f3a7c1e5b28
+Create Date: 2026-10-18 18:12:40.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8f5c7e134'
+down_revision: Union[str, Sequence[str], None] = '9f3a7c1e5b28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('email_id', sa.String(), nullable=False),
+        sa.Column('email_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('seq', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('email_outbox')
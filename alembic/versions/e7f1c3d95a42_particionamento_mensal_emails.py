@@ -0,0 +1,153 @@
+"""Particionamento mensal da tabela emails por date
+
+Revision ID: e7f1c3d95a42
+Revises: c4e8b2a7f319
+Create Date: 2026-10-18 13:41:52.117085
+
+"""
+from typing import Sequence, Union
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f1c3d95a42'
+down_revision: Union[str, Sequence[str], None] = 'c4e8b2a7f319'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# partições futuras criadas já na migração
+MONTHS_AHEAD = 3
+DEFAULT_PARTITION = "emails_default"
+
+SEARCH_VECTOR_EXPR = (
+    "setweight(to_tsvector('portuguese', coalesce(subject, '')), 'A') || "
+    "setweight(to_tsvector('portuguese', coalesce(body, '')), 'B')"
+)
+
+COPY_COLUMNS = "id, subject, body, category, date, inserted_at, updated_at, deleted_at"
+
+
+# DDL das partições como era nesta revisão (não depende do código da aplicação)
+def _month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition_sql(month: date) -> str:
+    start = _month_start(month)
+    end = _add_months(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS emails_p{start:%Y%m} PARTITION OF emails "
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    )
+
+
+def _create_indexes() -> None:
+    op.create_index(
+        'ix_emails_live_date_id', 'emails',
+        [sa.text('date DESC'), sa.text('id DESC')],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_emails_live_category_date_id', 'emails',
+        ['category_normalized', sa.text('date DESC'), sa.text('id DESC')],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index('ix_emails_search_vector', 'emails', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    op.rename_table('emails', 'emails_legacy')
+    for index in ('ix_emails_live_date_id', 'ix_emails_live_category_date_id', 'ix_emails_search_vector'):
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_legacy")
+    op.execute("ALTER TABLE emails_legacy RENAME CONSTRAINT emails_pkey TO emails_legacy_pkey")
+
+    # date passa a ser obrigatória (chave de partição e parte da PK)
+    op.execute("UPDATE emails_legacy SET date = coalesce(inserted_at, now()) WHERE date IS NULL")
+
+    op.execute(f"""
+        CREATE TABLE emails (
+            id VARCHAR NOT NULL,
+            subject VARCHAR NOT NULL,
+            body VARCHAR,
+            category VARCHAR,
+            date TIMESTAMP WITH TIME ZONE NOT NULL,
+            inserted_at TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE,
+            deleted_at TIMESTAMP WITH TIME ZONE,
+            category_normalized VARCHAR GENERATED ALWAYS AS (lower(category)) STORED,
+            search_vector TSVECTOR GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPR}) STORED,
+            CONSTRAINT emails_pkey PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+
+    # uma partição por mês do histórico existente até MONTHS_AHEAD à frente
+    oldest = bind.execute(sa.text("SELECT min(date) FROM emails_legacy")).scalar()
+    current = _month_start(datetime.now(timezone.utc).date())
+    month = _month_start(oldest.astimezone(timezone.utc).date()) if oldest else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        op.execute(_create_partition_sql(month))
+        month = _add_months(month, 1)
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF emails DEFAULT")
+
+    _create_indexes()
+
+    op.execute(f"INSERT INTO emails ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM emails_legacy")
+    op.drop_table('emails_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('emails', 'emails_partitioned')
+    for index in ('ix_emails_live_date_id', 'ix_emails_live_category_date_id', 'ix_emails_search_vector'):
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_partitioned")
+    op.execute("ALTER TABLE emails_partitioned RENAME CONSTRAINT emails_pkey TO emails_partitioned_pkey")
+
+    op.execute(f"""
+        CREATE TABLE emails (
+            id VARCHAR NOT NULL,
+            subject VARCHAR NOT NULL,
+            body VARCHAR,
+            category VARCHAR,
+            date TIMESTAMP WITH TIME ZONE,
+            inserted_at TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE,
+            deleted_at TIMESTAMP WITH TIME ZONE,
+            category_normalized VARCHAR GENERATED ALWAYS AS (lower(category)) STORED,
+            search_vector TSVECTOR GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPR}) STORED,
+            CONSTRAINT emails_pkey PRIMARY KEY (id)
+        )
+    """)
+    # ids repetidos em datas diferentes: mantém o mais recente
+    op.execute(f"""
+        INSERT INTO emails ({COPY_COLUMNS})
+        SELECT DISTINCT ON (id) {COPY_COLUMNS} FROM emails_partitioned ORDER BY id, date DESC
+    """)
+    op.drop_table('emails_partitioned')
+
+    op.create_index(
+        'ix_emails_live_date_id', 'emails',
+        [sa.text('date DESC'), sa.text('id DESC')],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index(
+        'ix_emails_live_category_date_id', 'emails',
+        ['category_normalized', sa.text('date DESC'), sa.text('id DESC')],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index('ix_emails_search_vector', 'emails', ['search_vector'], unique=False, postgresql_using='gin')
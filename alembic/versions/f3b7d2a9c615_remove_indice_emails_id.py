@@ -0,0 +1,30 @@
+"""Remove o indice ix_emails_id da tabela particionada
+
+Revision ID: f3b7d2a9c615
+Revises: a5c1e8f2d694
+Create Date: 2026-10-18 21:12:40.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d2a9c615'
+down_revision: Union[str, Sequence[str], None] = 'a5c1e8f2d694'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a PK (id, date) já atende WHERE id = ?; o índice só custava escrita.
+    # IF EXISTS: bancos migrados após a correção de e7f1c3d95a42 não o têm
+    op.execute("DROP INDEX IF EXISTS ix_emails_id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # nada a recriar: o índice era redundante com a chave primária
+    pass
@@ -0,0 +1,73 @@
+"""
+Latência de fan-out: abre N clientes WebSocket, ingere e-mails e mede o
+tempo entre o POST e a chegada da notificação em cada cliente. Com
+batch_ms os clientes usam o modo lote do WebSocket.
+
+Para milhares de clientes aumente o limite de arquivos abertos (ulimit -n).
+"""
+from typing import Any, Dict, List
+from datetime import datetime, timezone
+import asyncio
+import json
+import random
+import time
+
+import httpx
+import websockets
+
+from benchmarks.common import API_URL, WS_URL, summarize, synthetic_email
+
+
+async def run(clients: int, messages: int, connect_concurrency: int = 200, batch_ms: int = 0) -> Dict[str, Any]:
+    sent_at: Dict[str, float] = {}
+    latencies: List[float] = []
+    received = 0
+    done = asyncio.Event()
+    expected = clients * messages
+
+    async def client_loop(ws):
+        nonlocal received
+        async for raw in ws:
+            now = time.perf_counter()
+            data = json.loads(raw)
+            # no modo lote cada frame é um array de notificações
+            for item in data if isinstance(data, list) else [data]:
+                started = sent_at.get(item.get("id"))
+                if started is not None:
+                    latencies.append(now - started)
+                    received += 1
+                    if received >= expected:
+                        done.set()
+
+    semaphore = asyncio.Semaphore(connect_concurrency)
+
+    async def connect():
+        async with semaphore:
+            url = f"{WS_URL}?batch_ms={batch_ms}" if batch_ms else WS_URL
+            return await websockets.connect(url, max_queue=None)
+
+    sockets = await asyncio.gather(*(connect() for _ in range(clients)))
+    tasks = [asyncio.create_task(client_loop(ws)) for ws in sockets]
+
+    rnd = random.Random(3)
+    run_id = f"fanout{int(time.time())}"
+    started_all = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(timeout=30) as http:
+            for i in range(messages):
+                email = synthetic_email(i, rnd, datetime.now(timezone.utc), 0)
+                email["id"] = f"{run_id}-{email['id']}"
+                email["date"] = email["date"].isoformat()
+                sent_at[email["id"]] = time.perf_counter()
+                await http.post(f"{API_URL}/emails", json=email)
+        try:
+            await asyncio.wait_for(done.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+
+    result = summarize(latencies, time.perf_counter() - started_all, expected - received)
+    return {"clients": clients, "messages": messages, "batch_ms": batch_ms, **result}
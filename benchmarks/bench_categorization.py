@@ -0,0 +1,80 @@
+"""
+Custo da categorização por e-mail: no próprio processo e em lotes no pool
+de processos do CategorizationEngine. Não depende da API nem do banco.
+
+    python -m benchmarks.bench_categorization --emails 100000 --workers 4
+"""
+from typing import Any, Dict
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import json
+import random
+
+from benchmarks.common import Timer, synthetic_email, write_results
+from src.services.categorization import CategorizationEngine, Categorizer
+
+
+def _emails(count: int):
+    rnd = random.Random(4)
+    now = datetime.now(timezone.utc)
+    return [synthetic_email(i, rnd, now) for i in range(count)]
+
+
+async def run(emails: int, rules_path: str, workers: int, batch_size: int) -> Dict[str, Any]:
+    with open(rules_path) as f:
+        spec = json.load(f)
+    items = [(e["subject"], e["body"]) for e in _emails(emails)]
+
+    categorizer = Categorizer(spec)
+    with Timer() as timer:
+        categorizer.categorize_many(items)
+    results: Dict[str, Any] = {
+        "inline": {
+            "emails": emails,
+            "elapsed_s": round(timer.elapsed, 3),
+            "us_per_email": round(timer.elapsed / emails * 1e6, 2),
+            "emails_per_s": round(emails / timer.elapsed, 1),
+        }
+    }
+
+    if workers > 0:
+        engine = CategorizationEngine(rules_path, None, workers, pool_min_batch=0, reload_seconds=0, body_chars=4000)
+        await engine.start()
+        try:
+            rows = [{"subject": s, "body": b} for s, b in items]
+            # aquece o pool (fork dos processos e compilação das regras)
+            await engine.categorize([dict(r) for r in rows[:batch_size]])
+            with Timer() as timer:
+                await asyncio.gather(*(
+                    engine.categorize(rows[start:start + batch_size])
+                    for start in range(0, len(rows), batch_size)
+                ))
+        finally:
+            await engine.stop()
+        results["pool"] = {
+            "emails": emails,
+            "workers": workers,
+            "batch_size": batch_size,
+            "elapsed_s": round(timer.elapsed, 3),
+            "us_per_email": round(timer.elapsed / emails * 1e6, 2),
+            "emails_per_s": round(emails / timer.elapsed, 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=100_000)
+    parser.add_argument("--rules", default="categorization_rules.example.json")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--out", default="bench_categorization.json")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.emails, args.rules, args.workers, args.batch_size))
+    print(json.dumps(results, indent=2))
+    write_results(args.out, {"categorization": results})
+
+
+if __name__ == "__main__":
+    main()
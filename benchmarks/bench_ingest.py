@@ -0,0 +1,78 @@
+"""
+Vazão e latência (p50/p99) do POST /emails e do POST /emails:batch contra
+uma API em execução (BENCH_API_URL).
+"""
+from typing import Any, Dict, List
+from datetime import datetime, timezone
+import asyncio
+import random
+import time
+
+import httpx
+
+from benchmarks.common import API_URL, Timer, summarize, synthetic_email
+
+
+def _payload(email: Dict[str, Any]) -> Dict[str, Any]:
+    return {**email, "date": email["date"].isoformat()}
+
+
+async def bench_single(requests: int, concurrency: int, run_id: str) -> Dict[str, Any]:
+    rnd = random.Random(1)
+    now = datetime.now(timezone.utc)
+    emails = [_payload(synthetic_email(i, rnd, now, 1)) for i in range(requests)]
+    for email in emails:
+        email["id"] = f"{run_id}-{email['id']}"
+
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for email in emails:
+        queue.put_nowait(email)
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while not queue.empty():
+            email = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post(f"{API_URL}/emails", json=email)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        with Timer() as timer:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return {"concurrency": concurrency, **summarize(latencies, timer.elapsed, errors)}
+
+
+async def bench_batch(batches: int, batch_size: int, run_id: str) -> Dict[str, Any]:
+    rnd = random.Random(2)
+    now = datetime.now(timezone.utc)
+    latencies: List[float] = []
+    errors = 0
+    async with httpx.AsyncClient(timeout=120) as client:
+        with Timer() as timer:
+            for b in range(batches):
+                items = []
+                for i in range(batch_size):
+                    email = _payload(synthetic_email(b * batch_size + i, rnd, now, 1))
+                    email["id"] = f"{run_id}-batch-{email['id']}"
+                    items.append(email)
+                started = time.perf_counter()
+                response = await client.post(f"{API_URL}/emails:batch", json=items)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+    result = summarize(latencies, timer.elapsed, errors)
+    result["emails_per_s"] = round(batches * batch_size / timer.elapsed, 1) if timer.elapsed else 0.0
+    return {"batch_size": batch_size, **result}
+
+
+async def run(requests: int, concurrency: int, batches: int, batch_size: int) -> Dict[str, Any]:
+    run_id = f"run{int(time.time())}"
+    return {
+        "single": await bench_single(requests, concurrency, run_id),
+        "batch": await bench_batch(batches, batch_size, run_id),
+    }
@@ -0,0 +1,69 @@
+"""
+Latência do GET /emails por combinação de filtros e profundidade de página,
+em paginação por offset e por cursor.
+"""
+from typing import Any, Dict, List, Optional
+import time
+
+import httpx
+
+from benchmarks.common import API_URL, summarize
+
+FILTER_COMBINATIONS: Dict[str, Dict[str, Any]] = {
+    "none": {},
+    "category": {"category": "Financeiro"},
+    "date_range": {"initial_date": "2026-01-01T00:00:00Z", "end_date": "2026-03-31T23:59:59Z"},
+    "category_date": {"category": "Suporte", "initial_date": "2026-01-01T00:00:00Z"},
+    "fulltext": {"name": "fatura pagamento"},
+    "substring": {"name": "fatura", "search": "substring"},
+    "fulltext_relevance": {"name": "contrato", "sort": "relevance"},
+}
+
+
+async def _measure(client: httpx.AsyncClient, params: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    started_all = time.perf_counter()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(f"{API_URL}/emails", params=params)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors += 1
+    return summarize(latencies, time.perf_counter() - started_all, errors)
+
+
+async def _cursor_at_depth(client: httpx.AsyncClient, params: Dict[str, Any], pages: int) -> Optional[str]:
+    cursor = None
+    for _ in range(pages):
+        query = {**params, "pagination": "cursor", "count": "none"}
+        if cursor:
+            query["cursor"] = cursor
+        response = await client.get(f"{API_URL}/emails", params=query)
+        cursor = response.json().get("next_cursor")
+        if not cursor:
+            break
+    return cursor
+
+
+async def run(limit: int, depths: List[int], repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(timeout=60) as client:
+        for name, filters in FILTER_COMBINATIONS.items():
+            for count in ("exact", "none"):
+                params = {**filters, "limit": limit, "count": count}
+                results[f"{name}/first_page/count={count}"] = await _measure(client, params, repeat)
+
+            for depth in depths:
+                params = {**filters, "limit": limit, "offset": depth * limit, "count": "none"}
+                results[f"{name}/offset_page_{depth}"] = await _measure(client, params, repeat)
+
+            # cursor: posiciona na página mais funda uma vez e mede a próxima
+            if "sort" not in filters:
+                for depth in depths:
+                    cursor = await _cursor_at_depth(client, {**filters, "limit": limit}, min(depth, 50))
+                    if cursor is None:
+                        continue
+                    params = {**filters, "limit": limit, "cursor": cursor, "count": "none"}
+                    results[f"{name}/cursor_page_{min(depth, 50)}"] = await _measure(client, params, repeat)
+    return results
@@ -0,0 +1,87 @@
+"""
+Utilitários compartilhados pelos benchmarks: medição de latência,
+percentis e gravação dos resultados em JSON para comparar entre commits.
+"""
+from typing import Any, Dict, List
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import platform
+import random
+import string
+import subprocess
+import time
+
+API_URL = os.getenv("BENCH_API_URL", "http://localhost:8000/api/v1")
+WS_URL = os.getenv("BENCH_WS_URL", "ws://localhost:8000/api/v1/websocket")
+
+CATEGORIES = ["Geral", "Financeiro", "Suporte", "Vendas", "RH", "Marketing", "Jurídico", "TI"]
+WORDS = [
+    "fatura", "pedido", "reunião", "contrato", "relatório", "pagamento", "entrega",
+    "cliente", "proposta", "urgente", "atualização", "acesso", "senha", "nota",
+    "boleto", "agenda", "projeto", "suporte", "cadastro", "orçamento",
+]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies_s: List[float], elapsed_s: float, errors: int = 0) -> Dict[str, Any]:
+    """Resumo padrão de uma medição: vazão e percentis em ms."""
+    count = len(latencies_s)
+    return {
+        "count": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_per_s": round(count / elapsed_s, 1) if elapsed_s else 0.0,
+        "p50_ms": round(percentile(latencies_s, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies_s, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies_s, 99) * 1000, 3),
+        "max_ms": round(max(latencies_s) * 1000, 3) if latencies_s else 0.0,
+    }
+
+
+def synthetic_email(index: int, rnd: random.Random, base_date: datetime, spread_days: int = 365) -> Dict[str, Any]:
+    words = rnd.choices(WORDS, k=rnd.randint(40, 400))
+    return {
+        "id": f"bench-{index}-{''.join(rnd.choices(string.ascii_lowercase, k=6))}",
+        "subject": " ".join(rnd.choices(WORDS, k=rnd.randint(3, 8))).capitalize(),
+        "body": "<html><body><p>" + " ".join(words) + "</p></body></html>",
+        "category": rnd.choice(CATEGORIES),
+        "date": base_date - timedelta(seconds=rnd.randint(0, spread_days * 86400)),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def write_results(path: str, results: Dict[str, Any]):
+    """Grava os resultados com metadados do ambiente (commit, máquina, horário)."""
+    payload = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+    print(f"resultados gravados em {path}")
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
@@ -0,0 +1,54 @@
+"""
+Compara dois arquivos de resultado de benchmarks.run e aponta regressões.
+
+    python -m benchmarks.compare base.json atual.json --threshold 10
+"""
+from typing import Any, Dict, Iterator, Tuple
+import argparse
+import json
+import sys
+
+# métricas em que maior é melhor; para as demais (latências) menor é melhor
+HIGHER_IS_BETTER = {"throughput_per_s", "emails_per_s"}
+METRICS = ("p50_ms", "p99_ms", "throughput_per_s", "emails_per_s")
+
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, str, float]]:
+    for key, value in results.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _flatten(value, path)
+        elif key in METRICS and isinstance(value, (int, float)):
+            yield prefix, key, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Variação percentual considerada regressão.")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    base_values = {(p, m): v for p, m, v in _flatten(base["results"])}
+    regressions = 0
+    print(f"{base['commit']} -> {current['commit']}")
+    for path, metric, value in _flatten(current["results"]):
+        previous = base_values.get((path, metric))
+        if not previous:
+            continue
+        change = (value - previous) / previous * 100
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        flag = "REGRESSÃO" if worse > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{path:60} {metric:18} {previous:12.2f} -> {value:12.2f} ({change:+6.1f}%) {flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
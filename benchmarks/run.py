@@ -0,0 +1,64 @@
+"""
+Executa os benchmarks e grava os resultados em JSON.
+
+    python -m benchmarks.run --suite ingest list broadcast --out bench.json
+    python -m benchmarks.compare base.json bench.json
+
+Requer a API rodando (BENCH_API_URL / BENCH_WS_URL) sobre um Postgres
+local, de preferência populado com python -m benchmarks.seed.
+"""
+import argparse
+import asyncio
+
+from benchmarks import bench_broadcast, bench_categorization, bench_ingest, bench_list
+from benchmarks.common import write_results
+
+
+async def run_suites(args) -> dict:
+    results = {}
+    if "ingest" in args.suite:
+        results["ingest"] = await bench_ingest.run(
+            args.requests, args.concurrency, args.batches, args.batch_size
+        )
+    if "list" in args.suite:
+        results["list"] = await bench_list.run(args.limit, args.depths, args.repeat)
+    if "broadcast" in args.suite:
+        results["broadcast"] = {
+            f"{clients}/batch_ms={args.ws_batch_ms}": await bench_broadcast.run(
+                clients, args.messages, batch_ms=args.ws_batch_ms
+            )
+            for clients in args.clients
+        }
+    if "categorization" in args.suite:
+        results["categorization"] = await bench_categorization.run(
+            args.categorization_emails, args.rules, args.workers, args.batch_size
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", nargs="+", default=["ingest", "list", "broadcast"],
+                        choices=["ingest", "list", "broadcast", "categorization"])
+    parser.add_argument("--out", default="bench_output.json")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--ws-batch-ms", type=int, default=0, help="Modo lote do WebSocket (0 = um frame por e-mail).")
+    parser.add_argument("--categorization-emails", type=int, default=100_000)
+    parser.add_argument("--rules", default="categorization_rules.example.json")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_suites(args))
+    write_results(args.out, results)
+
+
+if __name__ == "__main__":
+    main()
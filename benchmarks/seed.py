@@ -0,0 +1,58 @@
+"""
+Popula a tabela emails com N e-mails sintéticos via COPY.
+
+    python -m benchmarks.seed --rows 2000000
+
+Usa o mesmo banco da aplicação (DATABASE_URL / DB_*). As partições mensais
+cobrindo o intervalo de datas gerado são criadas antes da carga.
+"""
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import random
+
+import asyncpg
+
+from benchmarks.common import Timer, synthetic_email
+from src.database.config import settings
+from src.database.partitions import add_months, create_partition_sql, month_start
+
+COLUMNS = ["id", "subject", "body", "category", "date"]
+
+
+async def seed(rows: int, chunk: int, spread_days: int, seed_value: int):
+    conn = await asyncpg.connect(settings.DATABASE_URL.replace("+asyncpg", ""))
+    try:
+        now = datetime.now(timezone.utc)
+        month = month_start(add_months(now.date(), -(spread_days // 28 + 1)))
+        while month <= now.date():
+            await conn.execute(create_partition_sql(month))
+            month = add_months(month, 1)
+
+        rnd = random.Random(seed_value)
+        with Timer() as timer:
+            for start in range(0, rows, chunk):
+                records = []
+                for i in range(start, min(rows, start + chunk)):
+                    email = synthetic_email(i, rnd, now, spread_days)
+                    records.append(tuple(email[c] for c in COLUMNS))
+                await conn.copy_records_to_table("emails", records=records, columns=COLUMNS)
+                print(f"{min(rows, start + chunk)}/{rows}")
+        await conn.execute("ANALYZE emails")
+        print(f"{rows} e-mails em {timer.elapsed:.1f}s ({rows / timer.elapsed:.0f}/s)")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    parser.add_argument("--spread-days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(seed(args.rows, args.chunk, args.spread_days, args.seed))
+
+
+if __name__ == "__main__":
+    main()
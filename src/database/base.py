@@ -1,19 +1,126 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from typing import Any, Dict, Optional
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from dotenv import load_dotenv
 
+from src.database.config import settings
+
 load_dotenv()
 
-engine = create_async_engine(os.getenv('DATABASE_URL'), echo=False)
+
+class PoolWaitStats:
+    """Tempo gasto esperando uma conexão livre no pool."""
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "avg_wait_ms": self.wait_seconds_total * 1000 / self.checkouts if self.checkouts else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+def build_engine(url: str) -> AsyncEngine:
+    server_settings = {"application_name": "inboxstream-api"}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+
+    return create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # cache do asyncpg e do adaptador do SQLAlchemy
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        },
+    )
+
+
+async def use_maintenance_timeout(conn) -> None:
+    """
+    Troca o statement_timeout por DB_MAINTENANCE_STATEMENT_TIMEOUT_MS só na
+    transação corrente (equivale a SET LOCAL), para operações longas que o
+    limite das requisições mataria. `conn` é uma AsyncSession ou AsyncConnection.
+    """
+    await conn.execute(
+        text("SELECT set_config('statement_timeout', :timeout, true)"),
+        {"timeout": str(settings.DB_MAINTENANCE_STATEMENT_TIMEOUT_MS)},
+    )
+
+
+engine = build_engine(settings.DATABASE_URL)
+# sem réplica configurada, as leituras usam o primário
+read_engine = build_engine(settings.DB_READ_REPLICA_URL) if settings.DB_READ_REPLICA_URL else engine
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+AsyncReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_read_db():
+    """Sessão para consultas somente leitura (réplica, quando configurada)."""
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
+def pool_stats(target: AsyncEngine) -> Optional[Dict[str, Any]]:
+    pool = target.sync_engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "timeout_s": pool.timeout(),
+        **pool.wait_stats.as_dict(),
+    }
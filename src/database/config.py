@@ -1,3 +1,5 @@
+from typing import Optional
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -6,10 +8,126 @@ class Settings(BaseSettings):
     DB_USER: str = "inbox_user"
     DB_PASS: str = "inbox_pass"
     DB_NAME: str = "inboxstream_db"
+    # URL completa; quando definida (env DATABASE_URL) tem precedência sobre DB_*
+    DB_URL: Optional[str] = Field(None, validation_alias="DATABASE_URL")
+    # réplica de leitura usada por GET /emails e GET /emails/{id}
+    DB_READ_REPLICA_URL: Optional[str] = None
+
+    # Pool de conexões
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # cache de prepared statements do asyncpg (0 para uso atrás do pgbouncer em modo transaction)
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    # statement_timeout do servidor em ms (0 desativa)
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    # statement_timeout das transações de manutenção e exportação (rebuild do rollup,
+    # partições, compactação, GET /emails/export); 0 = sem limite
+    DB_MAINTENANCE_STATEMENT_TIMEOUT_MS: int = 0
+    DB_ECHO: bool = False
+
+    # Ingestão em lote (POST /emails:batch)
+    BATCH_MAX_ITEMS: int = 10000
+    BATCH_INSERT_CHUNK_SIZE: int = 1000
+
+    # Operações em massa (:bulk-update / :bulk-delete): linhas por UPDATE/commit
+    BULK_CHUNK_SIZE: int = 1000
+    # bloco vazio com linhas ainda casando (travadas por outra transação): novas tentativas
+    # com espera crescente a partir de BULK_LOCKED_BACKOFF_MS; depois, uma passada que espera os locks
+    BULK_LOCKED_RETRIES: int = 5
+    BULK_LOCKED_BACKOFF_MS: int = 50
+
+    # Compactação: move removidos (após a carência) e, opcionalmente, e-mails antigos para emails_archive
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_DELETED_GRACE_HOURS: float = 24.0
+    ARCHIVE_AFTER_DAYS: Optional[int] = None
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_INTERVAL_SECONDS: float = 300.0
+
+    # Exportação (GET /emails/export): linhas por FETCH do cursor e por bloco enviado
+    EXPORT_CHUNK_SIZE: int = 5000
+
+    # Buffer de ingestão (group commit dos POST /emails individuais)
+    INGEST_BUFFER_ENABLED: bool = False
+    INGEST_BUFFER_MAX_WAIT_MS: float = 5.0
+    INGEST_BUFFER_MAX_BATCH: int = 500
+    INGEST_BUFFER_MAX_QUEUE: int = 10000
+    INGEST_BUFFER_RETRY_AFTER: int = 1
+    # (id, date) recentes (e Idempotency-Keys) lembrados para reenvios não passarem pelo INSERT
+    INGEST_RECENT_IDS_MAX: int = 100_000
+
+    # Outbox de notificações: lote por leitura e intervalo de polling
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+
+    # Categorização automática dos e-mails recebidos sem categoria
+    CATEGORIZATION_RULES_PATH: Optional[str] = None
+    CATEGORIZATION_CLASSIFIER: Optional[str] = None    # "modulo:funcao" opcional
+    CATEGORIZATION_WORKERS: int = 0                    # 0 = sem pool de processos
+    CATEGORIZATION_POOL_MIN_BATCH: int = 200
+    CATEGORIZATION_INLINE_MAX_BATCH: int = 4            # acima disso, fora do event loop
+    CATEGORIZATION_RELOAD_SECONDS: float = 5.0
+    CATEGORIZATION_BODY_CHARS: int = 4000
+
+    # Cache do total exato da listagem (GET /emails?count=exact)
+    COUNT_CACHE_TTL_SECONDS: float = 5.0
+    COUNT_CACHE_MAX_ENTRIES: int = 1024
+
+    # Particionamento mensal da tabela emails por `date`
+    PARTITION_MAINTENANCE_ENABLED: bool = True
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_RETENTION_MONTHS: Optional[int] = None
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 6 * 3600
+
+    # Backplane de broadcast entre workers: "postgres" (LISTEN/NOTIFY) ou "memory"
+    BROADCAST_BACKPLANE: str = "postgres"
+    BROADCAST_CHANNEL: str = "inboxstream_emails"
+    # "at_most_once" ou "at_least_once" (reenvia após reconexão, pode duplicar)
+    BROADCAST_DELIVERY: str = "at_most_once"
+    # replay do at_least_once: seqs anteriores ao último recebido reenviados e limite por reconexão
+    BROADCAST_REPLAY_MARGIN_SEQS: int = 100
+    BROADCAST_REPLAY_MAX_MESSAGES: int = 10000
+
+    # Fila de envio por cliente WebSocket
+    WS_SEND_QUEUE_SIZE: int = 1000
+    # fila cheia: "drop_oldest", "disconnect" ou "coalesce" (troca o acúmulo por um aviso de resync)
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"
+
+    # Replay após reconexão (/websocket?since=<seq>)
+    WS_REPLAY_BUFFER_SIZE: int = 10000
+    WS_REPLAY_MAX_MESSAGES: int = 1000
+
+    # Server-Sent Events (GET /emails/stream)
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+
+    # Modo lote do WebSocket (?batch_ms=&batch_max=&compression=deflate): limites do servidor
+    WS_BATCH_MAX_WINDOW_MS: int = 1000
+    WS_BATCH_MAX_MESSAGES: int = 1000
+    WS_BATCH_DEFAULT_MESSAGES: int = 100
+    # compression=deflate: nível do zlib (1 = mais rápido) e quantos frames comprimidos
+    # ficam guardados para reaproveitar entre clientes que recebem o mesmo lote
+    WS_COMPRESSION_LEVEL: int = 1
+    WS_COMPRESSED_FRAME_CACHE_SIZE: int = 64
+
+    # Cache de leitura (detalhe e primeira página das listagens)
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_SECONDS: float = 30.0
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_LIST_MAX_LIMIT: int = 100
+    # listas distintas acompanhadas para a invalidação seletiva
+    CACHE_MAX_LISTS: int = 10000
+
+    # Observabilidade: /metrics (Prometheus) e spans OpenTelemetry opcionais
+    METRICS_ENABLED: bool = True
+    TRACING_ENABLED: bool = False
     
     @property
     def DATABASE_URL(self) -> str:
         """String de conexão assíncrona para o asyncpg."""
+        if self.DB_URL:
+            return self.DB_URL
         return (
             f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@"
             f"{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
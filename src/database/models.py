@@ -1,15 +1,133 @@
-from sqlalchemy import Column, String, DateTime, func
+from sqlalchemy import Column, String, DateTime, BigInteger, Index, Computed, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from src.database.base import Base
 
+# configuração de texto do Postgres usada no índice e nas consultas de busca
+SEARCH_CONFIG = "portuguese"
+# tamanho da prévia do corpo usada nas listagens
+PREVIEW_LENGTH = 200
+
 class Email(Base):
     __tablename__ = "emails"
 
-    id = Column(String, primary_key=True, index=True)
+    # a tabela é particionada por mês de `date`, que por isso faz parte da PK;
+    # a PK (id, date) também atende a busca do detalhe por id. A unicidade do
+    # id sozinho é garantida por EmailIdRegistry
+    id = Column(String, primary_key=True)
     subject = Column(String, nullable=False)
-    body = Column(String)
-    category = Column(String, index=True)
-    date = Column(DateTime(timezone=True), nullable=True)
+    # corpo comprimido (lz4, TOAST fora da linha) e carregado só quando pedido
+    body = deferred(Column(String))
+    # prévia em texto puro para as listagens, calculada pelo Postgres na ingestão
+    preview = Column(String, Computed(
+        f"left(btrim(regexp_replace(regexp_replace(coalesce(body, ''), '<[^>]*>', ' ', 'g'), '\\s+', ' ', 'g')), {PREVIEW_LENGTH})",
+        persisted=True,
+    ))
+    category = Column(String)
+    # lower(category) mantido pelo Postgres, para filtrar sem lower() na consulta
+    category_normalized = Column(String, Computed("lower(category)", persisted=True))
+    date = Column(DateTime(timezone=True), primary_key=True)
 
     inserted_at = Column(DateTime(timezone=True), default=func.now())
     updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now())
-    deleted_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # ordem global de inserção; é o cursor das notificações em tempo real
+    seq = Column(BigInteger, server_default=text("nextval('emails_seq')"), nullable=False)
+
+    # mantido pelo Postgres; subject pesa mais que body no ranking
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(subject, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(body, '')), 'B')",
+            persisted=True,
+        ),
+    ))
+
+    __table_args__ = (
+        # listagem sem categoria e paginação por cursor: ORDER BY date, id
+        Index(
+            "ix_emails_live_date_id",
+            text("date DESC"), text("id DESC"),
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        # listagem filtrada por categoria, já na ordem de date
+        Index(
+            "ix_emails_live_category_date_id",
+            "category_normalized", text("date DESC"), text("id DESC"),
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index("ix_emails_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_emails_seq", "seq"),
+        # compactação: e-mails removidos a arquivar
+        Index("ix_emails_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+
+class EmailIdRegistry(Base):
+    """
+    Ids em uso em emails. A PK da tabela particionada inclui date e não
+    impede o mesmo id em duas datas; esta tabela, não particionada, garante
+    o id único. A ingestão registra o id antes de inserir o e-mail (só a
+    data dona do id é gravada) e a compactação o libera ao arquivar.
+    """
+    __tablename__ = "email_ids"
+
+    id = Column(String, primary_key=True)
+    date = Column(DateTime(timezone=True), nullable=False)
+
+
+class EmailOutbox(Base):
+    """
+    Notificações pendentes, gravadas na mesma transação do e-mail. O
+    dispatcher (src/services/outbox.py) lê as linhas já commitadas, faz o
+    broadcast e as remove.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # (email_id, email_date) aponta para a linha de emails (PK particionada)
+    email_id = Column(String, nullable=False)
+    email_date = Column(DateTime(timezone=True), nullable=False)
+    seq = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class EmailStatsHourly(Base):
+    """
+    Rollup de e-mails por categoria e hora (UTC), mantido pelo dispatcher
+    do outbox a cada lote e reconstruível com `python -m src.services.stats`.
+    Responde o GET /emails/stats sem varrer a tabela emails.
+    """
+    __tablename__ = "email_stats_hourly"
+
+    # lower(category); '' para e-mails sem categoria
+    category = Column(String, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(BigInteger, nullable=False, server_default=text("0"))
+
+    __table_args__ = (
+        # histogramas por período sem filtro de categoria
+        Index("ix_email_stats_hourly_bucket", "bucket"),
+    )
+
+
+class EmailArchive(Base):
+    """
+    E-mails movidos para fora da tabela quente pela compactação
+    (src/services/archive.py): removidos há mais que o período de carência
+    ou, se configurado, mais antigos que ARCHIVE_AFTER_DAYS.
+    """
+    __tablename__ = "emails_archive"
+
+    id = Column(String, primary_key=True)
+    date = Column(DateTime(timezone=True), primary_key=True)
+    subject = Column(String, nullable=False)
+    body = deferred(Column(String))
+    category = Column(String)
+    inserted_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    deleted_at = Column(DateTime(timezone=True))
+    seq = Column(BigInteger)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
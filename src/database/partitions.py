@@ -0,0 +1,178 @@
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timezone
+import asyncio
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.database.base import use_maintenance_timeout
+from src.database.config import settings
+from src.database.models import Email
+
+logger = logging.getLogger("inboxstream.database.partitions")
+
+# emails é particionada por faixa mensal de `date`: emails_pAAAAMM
+PARTITION_PATTERN = re.compile(r"^emails_p(\d{4})(\d{2})$")
+DEFAULT_PARTITION = "emails_default"
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"emails_p{month:%Y%m}"
+
+
+def create_partition_sql(month: date) -> str:
+    """
+    DDL da partição mensal que contém `month` (limites em UTC). Corpos acima
+    de ~256 bytes são guardados fora da linha (TOAST), mantendo as linhas
+    lidas pelas listagens pequenas.
+    """
+    start = month_start(month)
+    end = add_months(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF emails "
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00') "
+        f"WITH (toast_tuple_target = 256)"
+    )
+
+
+async def list_partitions(conn) -> List[str]:
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'emails'::regclass"
+    ))
+    return [row[0] for row in result.all()]
+
+
+# colunas gravadas pela aplicação (as geradas são recalculadas pelo Postgres)
+STORED_COLUMNS = ", ".join(c.name for c in Email.__table__.columns if c.computed is None)
+
+
+def _month_bounds(month: date) -> Tuple[datetime, datetime]:
+    start, end = month_start(month), add_months(month_start(month), 1)
+    return (
+        datetime(start.year, start.month, 1, tzinfo=timezone.utc),
+        datetime(end.year, end.month, 1, tzinfo=timezone.utc),
+    )
+
+
+async def _create_partition(conn, month: date, has_default: bool) -> int:
+    """
+    Cria a partição de `month`. Se a partição DEFAULT já tem linhas dessa
+    faixa (e-mails datados além das partições criadas), o CREATE ... PARTITION OF
+    falharia: as linhas são retiradas da DEFAULT, a partição é criada e
+    elas são reinseridas, já roteadas para ela. Retorna quantas foram movidas.
+    """
+    moved = 0
+    if has_default:
+        start, end = _month_bounds(month)
+        # bloqueia gravações na DEFAULT até o commit (o CREATE exigiria este lock de qualquer forma)
+        await conn.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE"))
+        result = await conn.execute(text(
+            f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end"
+        ), {"start": start, "end": end})
+        moved = int(result.scalar_one())
+        if moved:
+            await conn.execute(text("CREATE TEMP TABLE partition_move (LIKE emails) ON COMMIT DROP"))
+            await conn.execute(text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end "
+                f"RETURNING {STORED_COLUMNS}) "
+                f"INSERT INTO partition_move ({STORED_COLUMNS}) SELECT {STORED_COLUMNS} FROM moved"
+            ), {"start": start, "end": end})
+
+    await conn.execute(text(create_partition_sql(month)))
+    if moved:
+        await conn.execute(text(
+            f"INSERT INTO emails ({STORED_COLUMNS}) SELECT {STORED_COLUMNS} FROM partition_move"
+        ))
+    return moved
+
+
+async def ensure_future_partitions(engine: AsyncEngine, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """
+    Cria as partições do mês atual até `months_ahead` meses à frente, cada
+    uma em sua própria transação: uma falha é registrada e não impede as
+    demais (a partição é tentada de novo na próxima execução).
+    """
+    current = month_start(today or datetime.now(timezone.utc).date())
+    async with engine.connect() as conn:
+        existing = set(await list_partitions(conn))
+    has_default = DEFAULT_PARTITION in existing
+
+    created = []
+    for i in range(months_ahead + 1):
+        month = add_months(current, i)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        try:
+            async with engine.begin() as conn:
+                # mover as linhas da DEFAULT pode passar do statement_timeout das requisições
+                await use_maintenance_timeout(conn)
+                moved = await _create_partition(conn, month, has_default)
+        except Exception:
+            logger.exception("could not create partition %s", name)
+            continue
+        if moved:
+            logger.info("moved %d rows from %s to %s", moved, DEFAULT_PARTITION, name)
+        created.append(name)
+    if created:
+        logger.info("created partitions: %s", created)
+    return created
+
+
+async def drop_expired_partitions(engine: AsyncEngine, retention_months: int, today: Optional[date] = None) -> List[str]:
+    """
+    Desanexa e remove as partições mensais inteiramente anteriores ao
+    horizonte de retenção (mês atual - retention_months).
+    """
+    horizon = add_months(month_start(today or datetime.now(timezone.utc).date()), -retention_months)
+    dropped = []
+    async with engine.begin() as conn:
+        for name in sorted(await list_partitions(conn)):
+            match = PARTITION_PATTERN.match(name)
+            if not match:
+                continue
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if add_months(month, 1) > horizon:
+                continue
+            await conn.execute(text(f"ALTER TABLE emails DETACH PARTITION {name}"))
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    if dropped:
+        logger.info("dropped expired partitions: %s", dropped)
+    return dropped
+
+
+async def run_maintenance(engine: AsyncEngine):
+    await ensure_future_partitions(engine, settings.PARTITION_MONTHS_AHEAD)
+    if settings.PARTITION_RETENTION_MONTHS:
+        await drop_expired_partitions(engine, settings.PARTITION_RETENTION_MONTHS)
+
+
+async def maintenance_loop(engine: AsyncEngine):
+    """Tarefa de fundo iniciada no lifespan: cria partições futuras e aplica a retenção."""
+    while True:
+        try:
+            await run_maintenance(engine)
+        except Exception:
+            logger.exception("partition maintenance failed")
+        await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    # Para rodar manualmente: python -m src.database.partitions
+    from src.database.base import engine
+
+    asyncio.run(run_maintenance(engine))
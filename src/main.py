@@ -1,12 +1,48 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from src.routers import emails as email_router
 from src.routers import websockets as websocket_router
+from src.database.base import engine, read_engine, pool_stats
+from src.database.config import settings
+from src.database.partitions import maintenance_loop
+from src.services.archive import archive_loop
+from src.services.ingestion import ingestion_buffer, recent_ingests
+from src.services.websockets import manager
+from src.services.outbox import outbox_dispatcher
+from src.services.categorization import categorization_engine
+from src.services.cache import email_cache
+from src.metrics import MetricsMiddleware, instrument_engine, register_collector
 from fastapi.middleware.cors import CORSMiddleware
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await categorization_engine.start()
+    await manager.start()
+    await outbox_dispatcher.start()
+    if settings.INGEST_BUFFER_ENABLED:
+        await ingestion_buffer.start()
+    background_tasks = []
+    if settings.PARTITION_MAINTENANCE_ENABLED:
+        background_tasks.append(asyncio.create_task(maintenance_loop(engine)))
+    if settings.ARCHIVE_ENABLED:
+        background_tasks.append(asyncio.create_task(archive_loop()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await ingestion_buffer.stop()
+    await outbox_dispatcher.stop()
+    await manager.stop()
+    await categorization_engine.stop()
+
+
 app = FastAPI(
     title="InboxStream API",
     version="v1",
-    description="API para ingestão, categorização e notificação em tempo real de e-mails."
+    description="API para ingestão, categorização e notificação em tempo real de e-mails.",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -17,6 +53,15 @@ app.add_middleware(
     allow_headers=["*"],            
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "primary")
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        instrument_engine(read_engine, "replica")
+        engines["replica"] = read_engine
+    register_collector(manager, ingestion_buffer, engines)
+
 
 app.include_router(email_router.router, prefix="/api/v1")
 app.include_router(websocket_router.router, prefix="/api/v1")
@@ -25,4 +70,27 @@ app.include_router(websocket_router.router, prefix="/api/v1")
 def health_check():
     return {"status": "ok", "service": "InboxStream API is running!"}
 
+@app.get("/health/ingestion", tags=["Health"])
+def ingestion_health():
+    """Métricas do buffer de ingestão (lotes, latência de flush) e dos reenvios detectados em memória."""
+    return {**ingestion_buffer.stats(), "recent_ids": recent_ingests.stats()}
+
+@app.get("/health/db", tags=["Health"])
+def db_health():
+    """Estado do pool de conexões: ocupação, overflow e espera por conexão."""
+    return {
+        "primary": pool_stats(engine),
+        "replica": pool_stats(read_engine) if read_engine is not engine else None,
+    }
+
+@app.get("/health/cache", tags=["Health"])
+def cache_health():
+    """Contadores do cache de leitura: hits, misses, evictions e bytes."""
+    return email_cache.stats()
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    """Métricas no formato de exposição do Prometheus."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Para rodar: uvicorn src.main:app --reload
@@ -0,0 +1,196 @@
+"""
+Métricas Prometheus da API, expostas em GET /metrics.
+
+Os contadores e histogramas do caminho quente custam só um incremento em
+memória; gauges caros de calcular (sockets conectados, profundidade das
+filas, pool) são lidos apenas no momento do scrape, pelo MetricsCollector.
+"""
+from typing import Any, Dict, Iterable, Optional
+import time
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# buckets em segundos, de 0,5 ms a 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "inboxstream_http_request_duration_seconds",
+    "Latência das requisições HTTP por rota (template) e status.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram(
+    "inboxstream_db_query_duration_seconds",
+    "Tempo de execução das instruções SQL por tipo (SELECT, INSERT, ...).",
+    ["engine", "statement"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_COMMIT_SECONDS = Histogram(
+    "inboxstream_db_commit_duration_seconds",
+    "Latência do commit das gravações de e-mails.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+FANOUT_SECONDS = Histogram(
+    "inboxstream_broadcast_fanout_duration_seconds",
+    "Tempo para enfileirar um lote de mensagens em todos os sockets do worker.",
+    buckets=LATENCY_BUCKETS,
+)
+FANOUT_MESSAGES = Counter(
+    "inboxstream_broadcast_messages_total",
+    "Mensagens recebidas do backplane e distribuídas aos sockets.",
+)
+FANOUT_DELIVERIES = Counter(
+    "inboxstream_broadcast_deliveries_total",
+    "Mensagens enfileiradas em sockets (uma por mensagem e cliente).",
+)
+WS_FRAMES = Counter(
+    "inboxstream_websocket_frames_total",
+    "Frames enviados aos clientes WebSocket, por modo (single ou batch).",
+    ["mode"],
+)
+WS_COMPRESSED_FRAMES = Counter(
+    "inboxstream_websocket_compressed_frames_total",
+    "Frames com compression=deflate: comprimidos ou reaproveitados de outro cliente (compressed ou shared).",
+    ["result"],
+)
+SLOW_CONSUMERS = Counter(
+    "inboxstream_slow_consumers_disconnected_total",
+    "Clientes desconectados por fila de saída cheia.",
+)
+OUTBOX_DISPATCHED = Counter(
+    "inboxstream_outbox_dispatched_total",
+    "Notificações lidas do outbox e entregues aos sinks.",
+)
+OUTBOX_LAG_SECONDS = Histogram(
+    "inboxstream_outbox_lag_seconds",
+    "Tempo entre a gravação no outbox e a entrega da notificação.",
+    buckets=LATENCY_BUCKETS,
+)
+CATEGORIZATION_SECONDS = Histogram(
+    "inboxstream_categorization_duration_seconds",
+    "Tempo para categorizar um lote de e-mails.",
+    buckets=LATENCY_BUCKETS,
+)
+EMAILS_CATEGORIZED = Counter(
+    "inboxstream_emails_categorized_total",
+    "E-mails categorizados automaticamente, por origem (rule, classifier, default).",
+    ["source"],
+)
+EMAILS_INGESTED = Counter(
+    "inboxstream_emails_ingested_total",
+    "E-mails recebidos por origem (single, buffer, batch) e resultado.",
+    ["source", "status"],
+)
+
+_STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "EXPLAIN", "COPY"}
+
+
+def statement_type(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in _STATEMENT_TYPES else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Mede o tempo de cada instrução executada pelo engine."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        DB_QUERY_SECONDS.labels(name, statement_type(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro (sem BaseHTTPMiddleware, que bufferiza o corpo e
+    atrasa streams). O rótulo é o template da rota, ex.: /api/v1/emails/{email_id},
+    para manter a cardinalidade baixa.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], path, str(status["code"])).observe(
+                time.perf_counter() - started
+            )
+
+
+class MetricsCollector:
+    """Gauges calculados no scrape: sockets, filas e pools de conexão."""
+    def __init__(self, manager, ingestion_buffer, engines: Dict[str, AsyncEngine]):
+        self.manager = manager
+        self.ingestion_buffer = ingestion_buffer
+        self.engines = engines
+
+    def collect(self) -> Iterable[Any]:
+        sockets = GaugeMetricFamily(
+            "inboxstream_connected_clients", "Clientes de notificação conectados neste worker.", labels=["transport"]
+        )
+        queued = GaugeMetricFamily(
+            "inboxstream_client_queue_depth", "Mensagens aguardando envio nas filas dos clientes.", labels=["transport"]
+        )
+        counts: Dict[str, int] = {"websocket": 0, "sse": 0}
+        depths: Dict[str, int] = {"websocket": 0, "sse": 0}
+        for client in list(self.manager.active_connections.values()):
+            transport = client.transport
+            counts[transport] += 1
+            depths[transport] += client.queue.qsize()
+        for transport in counts:
+            sockets.add_metric([transport], counts[transport])
+            queued.add_metric([transport], depths[transport])
+        yield sockets
+        yield queued
+
+        backplane = GaugeMetricFamily(
+            "inboxstream_backplane_queue_depth", "Notificações recebidas do backplane ainda não distribuídas."
+        )
+        backplane.add_metric([], self.manager.backplane.queue_depth())
+        yield backplane
+
+        ingestion = GaugeMetricFamily(
+            "inboxstream_ingestion_queue_depth", "E-mails aguardando o próximo flush do buffer de ingestão."
+        )
+        ingestion.add_metric([], self.ingestion_buffer.queue_depth())
+        yield ingestion
+
+        checked_out = GaugeMetricFamily(
+            "inboxstream_db_pool_checked_out", "Conexões em uso no pool.", labels=["engine"]
+        )
+        for name, engine in self.engines.items():
+            checked_out.add_metric([name], engine.pool.checkedout())
+        yield checked_out
+
+
+def register_collector(manager, ingestion_buffer, engines: Dict[str, AsyncEngine], registry: Optional[Any] = None):
+    (registry or REGISTRY).register(MetricsCollector(manager, ingestion_buffer, engines))
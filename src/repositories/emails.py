@@ -1,19 +1,219 @@
-from typing import Optional, List, Dict, Any, Tuple
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Set, Tuple, Hashable, AsyncIterator
+from datetime import datetime, timezone
+import json
 import logging
+import time
 
-from sqlalchemy import select, desc, asc, func, or_
+from sqlalchemy import select, update, desc, asc, func, or_, literal, tuple_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.engine import Result
+from sqlalchemy.orm import undefer
+from sqlalchemy.engine import Result, Row
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
-from src.database.models import Email
+from src.database.config import settings
+from src.database.models import Email, EmailIdRegistry, EmailOutbox, SEARCH_CONFIG
+from src.repositories.stats import StatsRepository, stats_key
+from src.metrics import DB_COMMIT_SECONDS
+from src.tracing import traced
 
 logger = logging.getLogger("inboxstream.repositories.emails")
 
+
+class CountCache:
+    """
+    Cache em memória, com TTL curto, dos totais exatos da listagem,
+    indexado pelo conjunto normalizado de filtros. Qualquer ingestão limpa
+    o cache inteiro, pois um novo e-mail pode alterar qualquer total.
+    """
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, int]] = {}
+
+    def get(self, key: Hashable) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, total = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return total
+
+    def set(self, key: Hashable, total: int):
+        if self.ttl <= 0:
+            return
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[key] = (time.monotonic() + self.ttl, total)
+
+    def invalidate(self):
+        self._entries.clear()
+
+
+count_cache = CountCache(settings.COUNT_CACHE_TTL_SECONDS, settings.COUNT_CACHE_MAX_ENTRIES)
+
+# colunas que podem ser devolvidas pela listagem e pelo detalhe
+RESPONSE_COLUMNS: Dict[str, Any] = {
+    "id": Email.id,
+    "subject": Email.subject,
+    "body": Email.body,
+    "preview": Email.preview,
+    "category": Email.category,
+    "category_normalized": Email.category_normalized,
+    "date": Email.date,
+    "inserted_at": Email.inserted_at,
+    "updated_at": Email.updated_at,
+    "deleted_at": Email.deleted_at,
+    "seq": Email.seq,
+}
+
+
+# a listagem não traz o corpo por padrão, só a prévia
+LIST_DEFAULT_FIELDS = [name for name in RESPONSE_COLUMNS if name != "body"]
+
+
+# chave de um e-mail gravado: a mesma do ON CONFLICT (PK da tabela particionada)
+EmailKey = Tuple[str, datetime]
+
+
+def email_key(email_id: str, date: datetime) -> EmailKey:
+    """(id, date em UTC): datas com e sem fuso do mesmo instante geram a mesma chave."""
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return email_id, date.astimezone(timezone.utc)
+
+
+def _response_columns(fields: Optional[List[str]]) -> List[Any]:
+    return [RESPONSE_COLUMNS[name] for name in fields]
+
+
+def _search_query(name: str):
+    return func.websearch_to_tsquery(SEARCH_CONFIG, name.strip())
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) de uma instrução, compilado com os mesmos
+    parâmetros vinculados da consulta (sem literal_binds, que não sabe
+    renderizar tipos como o REGCONFIG da busca full-text).
+    """
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
 class EmailRepository:
     def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
 
+    @staticmethod
+    def _parse_categories(category: Optional[List[str]]) -> List[str]:
+        # categorias: suporta ?category=a&category=b e ?category=a,b
+        cats: List[str] = []
+        if category:
+            for item in category:
+                cats.extend([c.strip() for c in item.split(",") if c.strip()])
+        return cats
+
+    @staticmethod
+    def _build_filters(
+        cats: List[str],
+        initial_date: Optional[datetime],
+        end_date: Optional[datetime],
+        name: Optional[str],
+        search: str = "fulltext",
+    ) -> List[Any]:
+        """Condições WHERE compartilhadas pela listagem e pelo contador."""
+        # e-mails removidos (soft delete) ficam fora; casa com os índices parciais
+        conditions: List[Any] = [Email.deleted_at.is_(None)]
+        if cats:
+            conditions.append(Email.category_normalized.in_([c.lower() for c in cats]))
+
+        # datas
+        if initial_date:
+            conditions.append(Email.date >= initial_date)
+        if end_date:
+            conditions.append(Email.date <= end_date)
+
+        # busca em subject e body: full-text (índice GIN) ou substring
+        if name and search == "fulltext":
+            conditions.append(Email.search_vector.op("@@")(_search_query(name)))
+        elif name:
+            pattern = f"%{name.strip().lower()}%"
+            conditions.append(
+                or_(
+                    func.lower(Email.subject).like(pattern),
+                    func.lower(Email.body).like(pattern),
+                )
+            )
+        return conditions
+
+    def list_statement(
+        self,
+        cats: List[str],
+        initial_date: Optional[datetime],
+        end_date: Optional[datetime],
+        order: str,
+        limit: int,
+        offset: int,
+        name: Optional[str] = None,
+        cursor: Optional[Tuple[datetime, str]] = None,
+        keyset: bool = False,
+        search: str = "fulltext",
+        sort: str = "date",
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[Any, List[Any]]:
+        """
+        SELECT da listagem (ver get_filtered_emails) e as condições WHERE
+        usadas também pelo contador. Separado para o teste de EXPLAIN
+        verificar o plano de cada combinação de filtros.
+        """
+        conditions = self._build_filters(cats, initial_date, end_date, name, search)
+        fulltext = bool(name) and search == "fulltext"
+
+        if fulltext:
+            query = _search_query(name)
+            headline = func.ts_headline(
+                SEARCH_CONFIG,
+                func.coalesce(Email.subject, "") + " " + func.coalesce(Email.body, ""),
+                query,
+                "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5",
+            ).label("snippet")
+            stmt = select(*_response_columns(fields or LIST_DEFAULT_FIELDS), headline).where(*conditions)
+        else:
+            stmt = select(*_response_columns(fields or LIST_DEFAULT_FIELDS)).where(*conditions)
+
+        # ordenação por (date, id) para que empates em date sejam estáveis
+        if fulltext and sort == "relevance":
+            rank = func.ts_rank_cd(Email.search_vector, query)
+            stmt = stmt.order_by(desc(rank), desc(Email.date), desc(Email.id))
+        elif order == "desc":
+            stmt = stmt.order_by(desc(Email.date), desc(Email.id))
+        else:
+            stmt = stmt.order_by(asc(Email.date), asc(Email.id))
+
+        if keyset:
+            stmt = stmt.where(Email.date.isnot(None))
+            if cursor is not None:
+                position = tuple_(Email.date, Email.id)
+                after = tuple_(literal(cursor[0], Email.date.type), literal(cursor[1]))
+                stmt = stmt.where(position < after if order == "desc" else position > after)
+            stmt = stmt.limit(limit)
+        else:
+            stmt = stmt.limit(limit).offset(offset)
+
+        return stmt, conditions
+
+    @traced("EmailRepository.get_filtered_emails")
     async def get_filtered_emails(
         self,
         category: Optional[List[str]],
@@ -23,79 +223,514 @@ class EmailRepository:
         limit: int,
         offset: int,
         name: Optional[str] = None,
-    ) -> Tuple[List[Email], int]:
+        cursor: Optional[Tuple[datetime, str]] = None,
+        keyset: bool = False,
+        count: str = "exact",
+        search: str = "fulltext",
+        sort: str = "date",
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[Row], Optional[int]]:
         """
         Retorna (items, total) aplicando filtros:
          - category: aceita lista e valores separados por vírgula
          - initial_date / end_date
          - order: "asc" | "desc"
          - limit / offset para paginação
-         - name: busca case-insensitive por substring em subject e body
+         - name: busca em subject e body; search="fulltext" usa o tsvector
+           indexado (websearch_to_tsquery) e preenche `snippet` com trechos
+           destacados; search="substring" faz LIKE case-insensitive
+         - sort: "date" ou "relevance" (ts_rank_cd, apenas com busca full-text)
+         - keyset / cursor: paginação por (date, id); a próxima página é
+           buscada a partir do último (date, id) retornado, sem OFFSET.
+           E-mails sem data não participam da paginação por cursor.
+         - count: "exact" (COUNT com cache de TTL curto), "estimate"
+           (estimativa do planner do Postgres) ou "none" (total = None)
+         - fields: colunas de RESPONSE_COLUMNS a selecionar; por padrão
+           todas menos body (a listagem usa a prévia)
+
+        Os itens são linhas (Row) só com as colunas pedidas, sem objetos do
+        ORM nem identity map.
         """
-        stmt = select(Email)
+        cats = self._parse_categories(category)
+        stmt, conditions = self.list_statement(
+            cats, initial_date, end_date, order, limit, offset, name, cursor, keyset, search, sort, fields
+        )
 
-        # categorias: suporta ?category=a&category=b e ?category=a,b
-        cats: List[str] = []
-        if category:
-            for item in category:
-                cats.extend([c.strip() for c in item.split(",") if c.strip()])
-            if cats:
-                lowered = [c.lower() for c in cats]
-                stmt = stmt.where(func.lower(Email.category).in_(lowered))
+        result: Result = await self.db_session.execute(stmt)
+        items: List[Row] = list(result.all())
 
-        # datas
-        if initial_date:
-            stmt = stmt.where(Email.date >= initial_date)
-        if end_date:
-            stmt = stmt.where(Email.date <= end_date)
+        # contador com mesmos filtros (sem limit/offset)
+        if keyset:
+            conditions.append(Email.date.isnot(None))
 
-        # busca em subject e body
-        if name:
-            pattern = f"%{name.strip().lower()}%"
-            stmt = stmt.where(
-                or_(
-                    func.lower(Email.subject).like(pattern),
-                    func.lower(Email.body).like(pattern),
-                )
+        total: Optional[int] = None
+        if count == "exact":
+            key = (
+                tuple(sorted({c.lower() for c in cats})),
+                initial_date.isoformat() if initial_date else None,
+                end_date.isoformat() if end_date else None,
+                name.strip().lower() if name else None,
+                search if name else None,
+                keyset,
             )
+            total = count_cache.get(key)
+            if total is None:
+                count_stmt = select(func.count()).select_from(Email).where(*conditions)
+                count_result = await self.db_session.execute(count_stmt)
+                total = int(count_result.scalar_one())
+                count_cache.set(key, total)
+        elif count == "estimate":
+            filtered = bool(cats or initial_date or end_date or name or keyset)
+            total = await self._estimate_count(conditions, filtered)
 
-        # ordenação e paginação
-        stmt = stmt.order_by(desc(Email.date) if order == "desc" else asc(Email.date))
-        stmt = stmt.limit(limit).offset(offset)
+        logger.debug("get_filtered_emails: returned %d items (total=%s) [cats=%s name=%s]", len(items), total, cats, name)
+        return items, total
 
-        result: Result = await self.db_session.execute(stmt)
-        items: List[Email] = list(result.scalars().all())
+    async def stream_filtered_emails(
+        self,
+        category: Optional[List[str]],
+        initial_date: Optional[datetime],
+        end_date: Optional[datetime],
+        order: str,
+        name: Optional[str] = None,
+        search: str = "fulltext",
+        fields: Optional[List[str]] = None,
+        chunk_size: int = 5000,
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Mesmos filtros de get_filtered_emails, sem paginação nem contagem:
+        as linhas vêm de um cursor do lado do servidor em blocos de
+        chunk_size, então a memória não depende do total exportado.
+        """
+        cats = self._parse_categories(category)
+        conditions = self._build_filters(cats, initial_date, end_date, name, search)
+        stmt = select(*_response_columns(fields or LIST_DEFAULT_FIELDS)).where(*conditions)
+        if order == "desc":
+            stmt = stmt.order_by(desc(Email.date), desc(Email.id))
+        else:
+            stmt = stmt.order_by(asc(Email.date), asc(Email.id))
 
-        # contador com mesmos filtros (sem limit/offset)
-        count_stmt = select(func.count()).select_from(Email)
-        if cats:
-            count_stmt = count_stmt.where(func.lower(Email.category).in_([c.lower() for c in cats]))
-        if initial_date:
-            count_stmt = count_stmt.where(Email.date >= initial_date)
-        if end_date:
-            count_stmt = count_stmt.where(Email.date <= end_date)
-        if name:
-            pattern = f"%{name.strip().lower()}%"
-            count_stmt = count_stmt.where(
-                or_(
-                    func.lower(Email.subject).like(pattern),
-                    func.lower(Email.body).like(pattern),
-                )
+        result = await self.db_session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions(chunk_size):
+            yield partition
+
+    async def _estimate_count(self, conditions: List[Any], filtered: bool) -> int:
+        """
+        Estimativa de linhas sem varrer a tabela: soma de pg_class.reltuples
+        das partições quando não há filtros, senão o "Plan Rows" do EXPLAIN
+        da consulta filtrada.
+
+        A tabela pai particionada nunca é analisada pelo autovacuum (reltuples
+        fica em -1); quem tem estimativa são as partições. Partições ainda
+        não analisadas (-1) contam como vazias.
+        """
+        if not filtered:
+            result = await self.db_session.execute(text(
+                "SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint FROM pg_class c "
+                "WHERE c.oid = 'emails'::regclass "
+                "OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'emails'::regclass)"
+            ))
+            return int(result.scalar_one() or 0)
+
+        plan = await self.explain(select(Email.id).where(*conditions))
+        return int(plan["Plan Rows"])
+
+    async def explain(self, stmt) -> Dict[str, Any]:
+        """Nó raiz do EXPLAIN (FORMAT JSON) de `stmt`, sem executá-lo."""
+        result = await self.db_session.execute(Explain(stmt))
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]
+
+    @traced("EmailRepository.get_email_by_id")
+    async def get_email_by_id(
+        self, email_id: str, include_deleted: bool = False, date: Optional[datetime] = None
+    ) -> Optional[Row]:
+        """
+        Detalhe por id; com `date`, a linha exata da PK (id, date), lida só
+        na partição do mês. O id é único (email_ids); se houver linhas
+        repetidas de antes do registro, vale a de data mais antiga, a mesma
+        que o registro adotou.
+        """
+        stmt = select(*_response_columns(list(RESPONSE_COLUMNS))).where(Email.id == email_id)
+        if date is not None:
+            stmt = stmt.where(Email.date == date)
+        if not include_deleted:
+            stmt = stmt.where(Email.deleted_at.is_(None))
+        result = await self.db_session.execute(stmt.order_by(asc(Email.date)).limit(1))
+        return result.first()
+
+    @traced("EmailRepository.get_emails_since")
+    async def get_emails_since(self, seq: int, limit: int) -> List[Email]:
+        """E-mails com seq > `seq`, em ordem de seq (replay de notificações)."""
+        stmt = (
+            select(Email)
+            .options(undefer(Email.body))
+            .where(Email.seq > seq, Email.deleted_at.is_(None))
+            .order_by(asc(Email.seq))
+            .limit(limit)
+        )
+        result = await self.db_session.execute(stmt)
+        return list(result.scalars().all())
+
+    @traced("EmailRepository.get_emails_by_ids")
+    async def get_emails_by_ids(self, ids: List[str]) -> Dict[str, Row]:
+        """
+        Linhas já gravadas (inclusive removidas), por id (resposta de
+        reenvios, inclusive os com o mesmo id e outra data).
+        """
+        if not ids:
+            return {}
+        result = await self.db_session.execute(
+            select(*_response_columns(list(RESPONSE_COLUMNS)))
+            .where(Email.id.in_(ids))
+            .order_by(asc(Email.date))
+        )
+        rows: Dict[str, Row] = {}
+        for row in result.all():
+            rows.setdefault(row.id, row)
+        return rows
+
+    async def _register_ids(self, rows: List[Dict[str, Any]]) -> Dict[str, datetime]:
+        """
+        Registra em email_ids os ids ainda livres de `rows` e retorna id ->
+        data dona do id (a desta chamada ou a já registrada). Sem commit.
+
+        O INSERT espera transações concorrentes que registram o mesmo id;
+        o SELECT seguinte (novo snapshot) já vê o registro delas.
+        """
+        # ordenado pela PK: transações concorrentes esperam os mesmos ids na mesma ordem
+        values = sorted(({"id": row["id"], "date": row["date"]} for row in rows), key=lambda v: v["id"])
+        await self.db_session.execute(
+            pg_insert(EmailIdRegistry).values(values).on_conflict_do_nothing(index_elements=[EmailIdRegistry.id])
+        )
+        result = await self.db_session.execute(
+            select(EmailIdRegistry.id, EmailIdRegistry.date).where(EmailIdRegistry.id.in_({v["id"] for v in values}))
+        )
+        return dict(result.all())
+
+    @staticmethod
+    def _owns_id(row: Dict[str, Any], owners: Dict[str, datetime]) -> bool:
+        owner = owners.get(row["id"])
+        return owner is not None and email_key(row["id"], row["date"]) == email_key(row["id"], owner)
+
+    @traced("EmailRepository.create_email")
+    async def create_email(self, email_data: Dict[str, Any]) -> Tuple[Row, bool]:
+        """
+        Insere o e-mail com ON CONFLICT DO NOTHING: um reenvio do mesmo
+        (id, date) não gera erro nem nova linha. Um id já registrado com
+        outra data também não é gravado (ver EmailIdRegistry). A notificação
+        de uma linha nova vai para o outbox na mesma transação.
+
+        Retorna (linha, criado): a linha gravada nesta chamada, ou a já
+        existente com criado=False.
+        """
+        owners = await self._register_ids([email_data])
+        row = None
+        if self._owns_id(email_data, owners):
+            stmt = (
+                pg_insert(Email)
+                .values(**email_data)
+                .on_conflict_do_nothing(index_elements=[Email.id, Email.date])
+                .returning(*_response_columns(list(RESPONSE_COLUMNS)))
             )
+            result = await self.db_session.execute(stmt)
+            row = result.first()
+        if row is not None:
+            await self._enqueue_notifications([(row.id, row.date, row.seq)])
+        with DB_COMMIT_SECONDS.labels("single").time():
+            await self.db_session.commit()
+        if row is not None:
+            count_cache.invalidate()
+            return row, True
+        existing = await self.get_email_by_id(email_data["id"], include_deleted=True, date=owners.get(email_data["id"]))
+        return existing, False
+
+    def bulk_conditions(
+        self,
+        category: Optional[List[str]],
+        initial_date: Optional[datetime],
+        end_date: Optional[datetime],
+        name: Optional[str] = None,
+        search: str = "fulltext",
+    ) -> List[Any]:
+        """Filtros das operações em massa: os mesmos da listagem (só e-mails não removidos)."""
+        return self._build_filters(self._parse_categories(category), initial_date, end_date, name, search)
 
-        count_result = await self.db_session.execute(count_stmt)
-        total: int = int(count_result.scalar_one())
+    async def has_matching(self, conditions: List[Any]) -> bool:
+        """Se ainda existe alguma linha que casa com os filtros (travada ou não)."""
+        result = await self.db_session.execute(select(Email.id).where(*conditions).limit(1))
+        found = result.first() is not None
+        await self.db_session.commit()
+        return found
 
-        logger.debug("get_filtered_emails: returned %d items (total=%d) [cats=%s name=%s]", len(items), total, cats, name)
-        return items, total
+    async def _lock_chunk(self, conditions: List[Any], chunk_size: int, skip_locked: bool = True) -> List[Row]:
+        """
+        Trava as próximas chunk_size linhas que casam com os filtros. Com
+        skip_locked, linhas em uso por outra transação (inclusive as que o
+        dispatcher do outbox está lendo) ficam para um próximo bloco; sem,
+        espera os locks serem liberados.
+        """
+        stmt = (
+            select(Email.id, Email.date, Email.category)
+            .where(*conditions)
+            .limit(chunk_size)
+            .with_for_update(of=Email, skip_locked=skip_locked)
+        )
+        result = await self.db_session.execute(stmt)
+        return list(result.all())
+
+    async def _pending_notifications(self, keys: List[Tuple[str, datetime]]) -> Set[Tuple[str, datetime]]:
+        """
+        (id, date) com notificação ainda no outbox, que o dispatcher
+        contabilizará no rollup com os valores finais da linha.
+
+        Lido em uma instrução separada, depois do lock das linhas: o
+        dispatcher trava o e-mail (FOR SHARE) antes de lê-lo, então ou já
+        commitou e removeu a notificação antes deste SELECT, ou vai esperar o
+        commit deste bloco e ler os valores novos.
+        """
+        result = await self.db_session.execute(
+            select(EmailOutbox.email_id, EmailOutbox.email_date)
+            .where(tuple_(EmailOutbox.email_id, EmailOutbox.email_date).in_(keys))
+        )
+        return {(email_id, email_date) for email_id, email_date in result.all()}
+
+    async def _apply_chunk(
+        self, conditions: List[Any], chunk_size: int, values: Dict[str, Any], adjust, skip_locked: bool = True
+    ) -> List[Row]:
+        locked = await self._lock_chunk(conditions, chunk_size, skip_locked)
+        if not locked:
+            await self.db_session.commit()
+            return []
+        keys = [(row.id, row.date) for row in locked]
+        pending = await self._pending_notifications(keys)
 
-    async def get_email_by_id(self, email_id: str) -> Optional[Email]:
-        stmt = select(Email).where(Email.id == email_id)
-        return await self.db_session.scalar(stmt)
+        stmt = (
+            update(Email)
+            .where(tuple_(Email.id, Email.date).in_(keys))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db_session.execute(stmt)
+
+        increments: Dict[Tuple[str, datetime], int] = {}
+        for row in locked:
+            if (row.id, row.date) not in pending:
+                for key, delta in adjust(row):
+                    increments[key] = increments.get(key, 0) + delta
+        await StatsRepository(self.db_session).add(increments)
+
+        await self.db_session.commit()
+        count_cache.invalidate()
+        return locked
+
+    @traced("EmailRepository.soft_delete_chunk")
+    async def soft_delete_chunk(self, conditions: List[Any], chunk_size: int, skip_locked: bool = True) -> List[Row]:
+        """
+        Marca deleted_at em um bloco de até chunk_size e-mails e faz commit,
+        de modo que os locks duram só um bloco. Retorna as linhas afetadas;
+        lista vazia quando não sobrou nada livre a remover (com skip_locked,
+        linhas travadas por outra transação podem continuar casando).
+        """
+        return await self._apply_chunk(
+            conditions,
+            chunk_size,
+            {"deleted_at": func.now(), "updated_at": func.now()},
+            lambda row: [(stats_key(row.category, row.date), -1)],
+            skip_locked,
+        )
+
+    @traced("EmailRepository.recategorize_chunk")
+    async def recategorize_chunk(
+        self, conditions: List[Any], category: str, chunk_size: int, skip_locked: bool = True
+    ) -> List[Row]:
+        """Como soft_delete_chunk, trocando a categoria do bloco (e o rollup)."""
+        return await self._apply_chunk(
+            self.recategorize_conditions(conditions, category),
+            chunk_size,
+            {"category": category, "updated_at": func.now()},
+            lambda row: [(stats_key(row.category, row.date), -1), (stats_key(category, row.date), 1)],
+            skip_locked,
+        )
+
+    @staticmethod
+    def recategorize_conditions(conditions: List[Any], category: str) -> List[Any]:
+        # sem esta condição, as linhas já atualizadas voltariam no próximo bloco; compara a
+        # categoria exata para que uma troca só de maiúsculas ("fin" -> "Fin") também seja aplicada
+        return [*conditions, Email.category.is_distinct_from(category)]
+
+    @traced("EmailRepository.archive_batch")
+    async def archive_batch(
+        self, batch_size: int, deleted_before: Optional[datetime] = None, date_before: Optional[datetime] = None
+    ) -> List[str]:
+        """
+        Move até batch_size e-mails para emails_archive em uma transação:
+        removidos antes de `deleted_before` ou, com `date_before`, e-mails
+        ativos mais antigos que essa data. Retorna os ids movidos.
 
-    async def create_email(self, email_data: Dict[str, Any]) -> Email:
-        new_email = Email(**email_data)
-        self.db_session.add(new_email)
+        A linha só sai de emails se o INSERT no arquivo aconteceu: um (id,
+        date) que já está no arquivo (e-mail reingerido depois de arquivado)
+        fica fora do lote e continua em emails, sem perda. O id dos e-mails
+        movidos é liberado em email_ids.
+        """
+        if deleted_before is not None:
+            predicate = "deleted_at IS NOT NULL AND deleted_at < :before"
+            before = deleted_before
+        else:
+            predicate = "deleted_at IS NULL AND date < :before"
+            before = date_before
+        result = await self.db_session.execute(
+            text(
+                "WITH target AS ("
+                f"SELECT e.id, e.date FROM emails e WHERE {predicate} "
+                "AND NOT EXISTS (SELECT 1 FROM emails_archive a WHERE a.id = e.id AND a.date = e.date) "
+                "LIMIT :limit FOR UPDATE SKIP LOCKED"
+                "), archived AS ("
+                "INSERT INTO emails_archive (id, date, subject, body, category, inserted_at, updated_at, deleted_at, seq) "
+                "SELECT e.id, e.date, e.subject, e.body, e.category, e.inserted_at, e.updated_at, e.deleted_at, e.seq "
+                "FROM emails e JOIN target t ON e.id = t.id AND e.date = t.date "
+                "ON CONFLICT (id, date) DO NOTHING "
+                "RETURNING id, date"
+                "), moved AS ("
+                "DELETE FROM emails e USING archived a WHERE e.id = a.id AND e.date = a.date "
+                "RETURNING e.id, e.date"
+                "), released AS ("
+                "DELETE FROM email_ids r USING moved m WHERE r.id = m.id AND r.date = m.date"
+                ") "
+                "SELECT (SELECT count(*) FROM target) AS claimed, "
+                "coalesce((SELECT array_agg(id) FROM moved), '{}') AS ids"
+            ),
+            {"before": before, "limit": batch_size},
+        )
+        claimed, ids = result.one()
         await self.db_session.commit()
-        await self.db_session.refresh(new_email)
-        return new_email
\ No newline at end of file
+        if len(ids) < claimed:
+            # gravado no arquivo por outra transação entre o SELECT e o INSERT
+            logger.warning("archive_batch: %d rows already archived, kept in emails", claimed - len(ids))
+        if ids:
+            count_cache.invalidate()
+        return list(ids)
+
+    async def _lock_existing(self, keys: List[Tuple[str, datetime]]) -> Dict[Tuple[str, datetime], Row]:
+        """
+        Trava (FOR UPDATE) as linhas já existentes entre `keys` e retorna a
+        categoria e deleted_at de antes do upsert, por (id, date).
+        """
+        result = await self.db_session.execute(
+            select(Email.id, Email.date, Email.category, Email.deleted_at)
+            .where(tuple_(Email.id, Email.date).in_(keys))
+            .order_by(Email.id, Email.date)
+            .with_for_update(of=Email)
+        )
+        return {(row.id, row.date): row for row in result.all()}
+
+    async def _adjust_updated_stats(self, updated: List[Row], previous: Dict[Tuple[str, datetime], Row]) -> bool:
+        """
+        -1 na categoria anterior e +1 na nova para as linhas atualizadas pelo
+        upsert, sem commit. Linhas removidas não estão no rollup, e as com
+        notificação pendente serão contadas pelo dispatcher com a categoria final.
+        """
+        pending = await self._pending_notifications([(row.id, row.date) for row in updated])
+        increments: Dict[Tuple[str, datetime], int] = {}
+        for row in updated:
+            old = previous.get((row.id, row.date))
+            if old is None or old.deleted_at is not None or (row.id, row.date) in pending:
+                continue
+            for key, delta in ((stats_key(old.category, row.date), -1), (stats_key(row.category, row.date), 1)):
+                increments[key] = increments.get(key, 0) + delta
+        await StatsRepository(self.db_session).add(increments)
+        return any(increments.values())
+
+    async def _enqueue_notifications(self, entries: List[Tuple[str, datetime, int]]):
+        """Grava (id, date, seq) no outbox, sem commit: vale a transação corrente."""
+        if not entries:
+            return
+        await self.db_session.execute(
+            pg_insert(EmailOutbox).values([
+                {"email_id": email_id, "email_date": email_date, "seq": seq}
+                for email_id, email_date, seq in entries
+            ])
+        )
+
+    @traced("EmailRepository.create_emails_bulk")
+    async def create_emails_bulk(
+        self,
+        rows: List[Dict[str, Any]],
+        on_conflict: str = "nothing",
+        chunk_size: int = 1000,
+    ) -> Tuple[Dict[EmailKey, int], Set[EmailKey]]:
+        """
+        Insere vários e-mails com um único INSERT multi-linha por bloco
+        (chunk_size linhas) e um único commit ao final.
+
+         - on_conflict: "nothing" ignora (id, date) já existentes; "update" sobrescreve
+         - retorna ({email_key: seq} das linhas novas, email_keys das linhas
+           atualizadas pelo "update"); as demais chaves já existiam
+           (ignoradas) ou têm um id já registrado com outra data.
+
+        As linhas novas entram no outbox de notificações na mesma transação.
+        Com "update", a troca de categoria das linhas atualizadas é ajustada
+        no rollup (-1/+1) também na mesma transação, como em _apply_chunk.
+
+        As chaves (id, date) de `rows` devem ser únicas: o Postgres não permite
+        que o mesmo INSERT ... ON CONFLICT DO UPDATE afete uma linha duas vezes.
+        Como a tabela é particionada por date, o conflito é detectado por (id, date).
+        """
+        written: Dict[EmailKey, int] = {}
+        rewritten: Set[EmailKey] = set()
+        if not rows:
+            return written, rewritten
+        adjusted = False
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            # ids já registrados com outra data ficam de fora (nem inseridos nem atualizados)
+            owners = await self._register_ids(chunk)
+            chunk = [row for row in chunk if self._owns_id(row, owners)]
+            if not chunk:
+                continue
+            previous: Dict[Tuple[str, datetime], Row] = {}
+            if on_conflict == "update":
+                previous = await self._lock_existing([(row["id"], row["date"]) for row in chunk])
+            stmt = pg_insert(Email).values(chunk)
+            if on_conflict == "update":
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Email.id, Email.date],
+                    set_={
+                        "subject": stmt.excluded.subject,
+                        "body": stmt.excluded.body,
+                        "category": stmt.excluded.category,
+                        "updated_at": func.now(),
+                    },
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=[Email.id, Email.date])
+
+            # linha recém-inserida: inserted_at = now() desta transação (uma atualizada
+            # mantém o inserted_at antigo). A tabela particionada não aceita xmax no RETURNING.
+            stmt = stmt.returning(
+                Email.id, Email.date, Email.seq, Email.category,
+                (Email.inserted_at == func.now()).label("inserted"),
+            )
+            result = await self.db_session.execute(stmt)
+            notifications = []
+            updated = []
+            for row in result.all():
+                if row.inserted:
+                    written[email_key(row.id, row.date)] = row.seq
+                    notifications.append((row.id, row.date, row.seq))
+                else:
+                    rewritten.add(email_key(row.id, row.date))
+                    updated.append(row)
+            await self._enqueue_notifications(notifications)
+            if updated:
+                adjusted |= await self._adjust_updated_stats(updated, previous)
+
+        with DB_COMMIT_SECONDS.labels("bulk").time():
+            await self.db_session.commit()
+        if written or adjusted:
+            count_cache.invalidate()
+        logger.debug("create_emails_bulk: %d new and %d updated rows of %d", len(written), len(rewritten), len(rows))
+        return written, rewritten
@@ -0,0 +1,63 @@
+from typing import List
+
+from sqlalchemy import select, delete, and_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import Row
+
+from src.database.models import Email, EmailOutbox
+
+
+class OutboxRepository:
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def claim_batch(self, limit: int) -> List[Row]:
+        """
+        Próximas `limit` notificações pendentes, já com os campos do e-mail,
+        travadas até o fim da transação. SKIP LOCKED deixa cada worker com
+        um lote diferente. Se o e-mail não existe mais (arquivado), os campos
+        vêm nulos.
+
+        Os e-mails também são travados (FOR SHARE, esperando uma operação em
+        massa em andamento) antes de serem lidos, em uma instrução à parte:
+        assim os campos lidos são os já commitados por ela, e a operação em
+        massa, que usa SKIP LOCKED, deixa esses e-mails para o bloco seguinte.
+        """
+        claimed = await self.db_session.execute(
+            select(EmailOutbox.id, EmailOutbox.email_id, EmailOutbox.email_date)
+            .order_by(EmailOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = list(claimed.all())
+        if not claimed:
+            return []
+
+        await self.db_session.execute(
+            select(Email.id)
+            .where(tuple_(Email.id, Email.date).in_([(row.email_id, row.email_date) for row in claimed]))
+            .with_for_update(read=True)
+        )
+
+        stmt = (
+            select(
+                EmailOutbox.id.label("outbox_id"),
+                EmailOutbox.created_at,
+                EmailOutbox.seq,
+                Email.id,
+                Email.subject,
+                Email.body,
+                Email.category,
+                Email.date,
+                Email.deleted_at,
+            )
+            .select_from(EmailOutbox)
+            .outerjoin(Email, and_(Email.id == EmailOutbox.email_id, Email.date == EmailOutbox.email_date))
+            .where(EmailOutbox.id.in_([row.id for row in claimed]))
+            .order_by(EmailOutbox.id)
+        )
+        result = await self.db_session.execute(stmt)
+        return list(result.all())
+
+    async def delete(self, outbox_ids: List[int]):
+        await self.db_session.execute(delete(EmailOutbox).where(EmailOutbox.id.in_(outbox_ids)))
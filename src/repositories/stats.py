@@ -0,0 +1,133 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+
+from sqlalchemy import select, delete, func, text, desc, cast, BigInteger
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.engine import Row
+
+from src.database.models import EmailStatsHourly
+
+# chave do rollup: (lower(category) ou '', hora em UTC)
+Increments = Dict[Tuple[str, datetime], int]
+
+
+def hour_bucket(d: datetime) -> datetime:
+    if d.tzinfo is None:
+        d = d.replace(tzinfo=timezone.utc)
+    return d.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def stats_key(category: Optional[str], date: datetime) -> Tuple[str, datetime]:
+    return (category or "").lower(), hour_bucket(date)
+
+
+class StatsRepository:
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def add(self, increments: Increments):
+        """Soma (ou subtrai, com valores negativos) contagens no rollup, sem commit."""
+        values = [
+            {"category": category, "bucket": bucket, "count": count}
+            for (category, bucket), count in sorted(increments.items())
+            if count
+        ]
+        if not values:
+            return
+        # ordenado pela PK: transações concorrentes travam as linhas na mesma ordem
+        stmt = pg_insert(EmailStatsHourly).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EmailStatsHourly.category, EmailStatsHourly.bucket],
+            set_={"count": EmailStatsHourly.count + stmt.excluded.count},
+        )
+        await self.db_session.execute(stmt)
+
+    @staticmethod
+    def _filters(categories: List[str], initial_date: Optional[datetime], end_date: Optional[datetime]) -> List:
+        conditions = []
+        if categories:
+            conditions.append(EmailStatsHourly.category.in_([c.lower() for c in categories]))
+        if initial_date:
+            conditions.append(EmailStatsHourly.bucket >= hour_bucket(initial_date))
+        if end_date:
+            conditions.append(EmailStatsHourly.bucket <= end_date)
+        return conditions
+
+    async def histogram(
+        self,
+        categories: List[str],
+        initial_date: Optional[datetime],
+        end_date: Optional[datetime],
+        bucket: str = "hour",
+    ) -> List[Row]:
+        """Contagem por (bucket, categoria); bucket "hour" ou "day" (UTC)."""
+        if bucket == "day":
+            period = func.date_trunc("day", EmailStatsHourly.bucket, "UTC")
+        else:
+            period = EmailStatsHourly.bucket
+        # sum(bigint) é numeric no Postgres; volta a inteiro para a resposta
+        total = func.sum(EmailStatsHourly.count)
+        stmt = (
+            select(period.label("bucket"), EmailStatsHourly.category, cast(total, BigInteger).label("count"))
+            .where(*self._filters(categories, initial_date, end_date))
+            .group_by(period, EmailStatsHourly.category)
+            .having(total != 0)
+            .order_by(period, EmailStatsHourly.category)
+        )
+        result = await self.db_session.execute(stmt)
+        return list(result.all())
+
+    async def top_categories(
+        self,
+        categories: List[str],
+        initial_date: Optional[datetime],
+        end_date: Optional[datetime],
+        limit: int,
+    ) -> List[Row]:
+        total = func.sum(EmailStatsHourly.count)
+        stmt = (
+            select(EmailStatsHourly.category, cast(total, BigInteger).label("count"))
+            .where(*self._filters(categories, initial_date, end_date))
+            .group_by(EmailStatsHourly.category)
+            .having(total != 0)
+            .order_by(desc(total), EmailStatsHourly.category)
+            .limit(limit)
+        )
+        result = await self.db_session.execute(stmt)
+        return list(result.all())
+
+    async def rebuild(self, since: Optional[datetime] = None) -> int:
+        """
+        Recalcula o rollup a partir de emails e de emails_archive (a partir
+        de `since`, ou tudo), sem commit. A tabela fica travada contra o dispatcher enquanto isso;
+        e-mails ainda pendentes no outbox ficam de fora, pois o dispatcher
+        os somará ao entregá-los.
+        """
+        await self.db_session.execute(text("LOCK TABLE email_stats_hourly IN SHARE ROW EXCLUSIVE MODE"))
+        start = hour_bucket(since) if since else None
+        stmt = delete(EmailStatsHourly)
+        if start is not None:
+            stmt = stmt.where(EmailStatsHourly.bucket >= start)
+        await self.db_session.execute(stmt)
+
+        result = await self.db_session.execute(
+            text(
+                "INSERT INTO email_stats_hourly (category, bucket, count) "
+                "SELECT category, bucket, count(*) FROM ("
+                "SELECT coalesce(e.category_normalized, '') AS category, date_trunc('hour', e.date, 'UTC') AS bucket "
+                "FROM emails e "
+                "WHERE e.deleted_at IS NULL "
+                "AND (CAST(:start AS timestamptz) IS NULL OR e.date >= :start) "
+                "AND NOT EXISTS ("
+                "SELECT 1 FROM email_outbox o WHERE o.email_id = e.id AND o.email_date = e.date) "
+                "UNION ALL "
+                "SELECT coalesce(lower(a.category), ''), date_trunc('hour', a.date, 'UTC') "
+                "FROM emails_archive a "
+                "WHERE a.deleted_at IS NULL "
+                "AND (CAST(:start AS timestamptz) IS NULL OR a.date >= :start)"
+                ") counted GROUP BY 1, 2"
+            ),
+            {"start": start},
+        )
+        return result.rowcount
@@ -1,17 +1,29 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import Optional, List
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Header, Response
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from typing import Optional, List, Any, Iterable
 from datetime import datetime
+import json
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.base import get_db
-from src.repositories.emails import EmailRepository
+from src.database.base import get_db, get_read_db
+from src.repositories.emails import EmailRepository, RESPONSE_COLUMNS
 from src.services.emails import EmailService
-from src.schemas.emails import Email as EmailSchema
+from src.services.export import export_emails, MEDIA_TYPES
+from src.services.stats import StatsService
+from src.repositories.stats import StatsRepository
+from src.services.ingestion import IngestionQueueFullError, IdempotencyKeyConflictError
+from src.services.websockets import manager
+from src.database.config import settings
+from src.schemas.websockets import NOTIFICATION_FIELDS
+from src.schemas.emails import (
+    Email as EmailSchema, BatchIngestResponse, EmailOut, EmailPage, EmailStatsOut,
+    BulkFilters, BulkUpdateRequest, BulkDeleteRequest, BulkResult,
+)
 
 logger = logging.getLogger("inboxstream.routers.emails")
-router = APIRouter(tags=["Emails"])
+router = APIRouter(tags=["Emails"], default_response_class=ORJSONResponse)
 
 
 def get_email_repo(db: AsyncSession = Depends(get_db)) -> EmailRepository:
@@ -22,24 +34,172 @@ def get_email_service(repo: EmailRepository = Depends(get_email_repo)) -> EmailS
     return EmailService(repo)
 
 
+def get_read_email_service(db: AsyncSession = Depends(get_read_db)) -> EmailService:
+    """Serviço sobre a réplica de leitura, para as rotas somente leitura."""
+    return EmailService(EmailRepository(db))
+
+
+def get_stats_service(db: AsyncSession = Depends(get_read_db)) -> StatsService:
+    return StatsService(StatsRepository(db))
+
+
 @router.post("/emails")
 async def ingest_email(
     email_data: EmailSchema,
+    idempotency_key: Optional[str] = Header(
+        None, description="Chave do envio; reenvios com a mesma chave devolvem o mesmo e-mail."
+    ),
     email_service: EmailService = Depends(get_email_service),
 ):
     """
     Recebe um novo e-mail do sistema externo, salva no DB e envia notificação.
+
+    Idempotente por (id, date): reenviar um e-mail já gravado devolve o
+    registro existente com o cabeçalho Idempotent-Replayed: true, sem nova
+    notificação.
     """
     logger.info("ingest_email called")
     logger.debug("payload: %s", email_data.model_dump())
 
-    new_email = await email_service.ingest_email(email_data.model_dump())
+    try:
+        email, created = await email_service.ingest_email(email_data.model_dump(), idempotency_key)
+    except IngestionQueueFullError:
+        logger.warning("ingestion buffer full, rejecting id=%s", email_data.id)
+        raise HTTPException(
+            status_code=503,
+            detail="Fila de ingestão cheia, tente novamente.",
+            headers={"Retry-After": str(settings.INGEST_BUFFER_RETRY_AFTER)},
+        )
+    except IdempotencyKeyConflictError:
+        raise HTTPException(status_code=422, detail="Idempotency-Key já usada com outro e-mail.")
+
+    if not created:
+        logger.info("email replay ignored id=%s", email_data.id)
+        return ORJSONResponse(email, headers={"Idempotent-Replayed": "true"})
+
+    logger.info("email ingested id=%s", email_data.id)
+    return email
+
+
+async def _read_batch_items(request: Request) -> List[Any]:
+    """
+    Lê o corpo do POST /emails:batch como array JSON ou NDJSON
+    (uma mensagem por linha, lida à medida que o stream chega).
+    """
+    content_type = request.headers.get("content-type", "")
+    items: List[Any] = []
+
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    items.append(_parse_ndjson_line(line))
+                if len(items) > settings.BATCH_MAX_ITEMS:
+                    raise HTTPException(status_code=413, detail="Lote excede o limite de itens.")
+        if buffer.strip():
+            items.append(_parse_ndjson_line(buffer))
+    else:
+        try:
+            items = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON inválido.")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="O corpo deve ser um array JSON.")
+
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail="Lote excede o limite de itens.")
+    return items
+
+
+def _parse_ndjson_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Linha NDJSON inválida.")
+
+
+@router.post("/emails:batch", response_model=BatchIngestResponse)
+async def ingest_emails_batch(
+    request: Request,
+    on_conflict: str = Query(
+        "nothing",
+        regex="^(nothing|update)$",
+        description="'nothing' ignora ids existentes; 'update' sobrescreve o e-mail existente (status 'updated').",
+    ),
+    email_service: EmailService = Depends(get_email_service),
+):
+    """
+    Recebe um lote de e-mails (array JSON ou NDJSON), grava com inserts
+    multi-linha e retorna o status de cada item.
+    """
+    logger.info("ingest_emails_batch called")
+
+    items = await _read_batch_items(request)
+    result = await email_service.ingest_emails_batch(items, on_conflict=on_conflict)
+
+    logger.info(
+        "ingest_emails_batch: accepted=%d updated=%d duplicate=%d rejected=%d",
+        result["accepted"],
+        result["updated"],
+        result["duplicate"],
+        result["rejected"],
+    )
+    return result
+
+
+def _bulk_filters(filters: BulkFilters) -> dict:
+    if filters.is_empty() and not filters.all:
+        raise HTTPException(status_code=400, detail="Informe ao menos um filtro ou all=true.")
+    return filters.model_dump(exclude={"all"})
+
+
+@router.post("/emails:bulk-update", response_model=BulkResult)
+async def bulk_update_emails(
+    request: BulkUpdateRequest,
+    email_service: EmailService = Depends(get_email_service),
+):
+    """
+    Recategoriza todos os e-mails que casam com os filtros, em blocos de
+    BULK_CHUNK_SIZE linhas com um commit por bloco (sem locks longos).
+    """
+    filters = _bulk_filters(request.filters)
+    logger.info("bulk_update_emails called category=%s filters=%s", request.category, filters)
+    affected = await email_service.bulk_recategorize(filters, request.category)
+    logger.info("bulk_update_emails: %d emails recategorized", affected)
+    return {"affected": affected}
+
+
+@router.post("/emails:bulk-delete", response_model=BulkResult)
+async def bulk_delete_emails(
+    request: BulkDeleteRequest,
+    email_service: EmailService = Depends(get_email_service),
+):
+    """
+    Remove (soft delete) todos os e-mails que casam com os filtros, em
+    blocos; a compactação os move depois para o arquivo.
+    """
+    filters = _bulk_filters(request.filters)
+    logger.info("bulk_delete_emails called filters=%s", filters)
+    affected = await email_service.bulk_delete(filters)
+    logger.info("bulk_delete_emails: %d emails deleted", affected)
+    return {"affected": affected}
+
 
-    logger.info("email ingested id=%s", getattr(new_email, "id", None))
-    return new_email
+def _parse_fields(fields: Optional[List[str]], allowed: Iterable[str] = RESPONSE_COLUMNS) -> Optional[List[str]]:
+    """Junta ?fields repetidos e separados por vírgula; 400 se algum não estiver em `allowed`."""
+    if not fields:
+        return None
+    fields = [f.strip() for item in fields for f in item.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconhecidos: {', '.join(unknown)}.")
+    return fields or None
 
 
-@router.get("/emails")
+@router.get("/emails", response_model=EmailPage, response_model_exclude_none=True)
 async def get_all_emails(
     category: Optional[List[str]] = Query(
         None,
@@ -52,7 +212,18 @@ async def get_all_emails(
         None, description="Filtra e-mails recebidos até esta data."
     ),
     name: Optional[str] = Query(
-        None, description="Busca por substring (case-insensitive) em subject e body."
+        None,
+        description="Busca em subject e body. Com search=fulltext aceita a sintaxe de busca web (\"frase exata\", OR, -termo).",
+    ),
+    search: str = Query(
+        "fulltext",
+        regex="^(fulltext|substring)$",
+        description="'fulltext' (indexada, com snippet destacado) ou 'substring' (LIKE case-insensitive, sem índice).",
+    ),
+    sort: str = Query(
+        "date",
+        regex="^(date|relevance)$",
+        description="'date' ou 'relevance' (apenas com name e search=fulltext).",
     ),
     order: str = Query(
         "desc",
@@ -61,11 +232,33 @@ async def get_all_emails(
     ),
     limit: int = Query(10, ge=1),
     offset: int = Query(0, ge=0),
-    email_service: EmailService = Depends(get_email_service),
+    pagination: str = Query(
+        "offset",
+        regex="^(offset|cursor)$",
+        description="'offset' (limit/offset) ou 'cursor' (usa next_cursor, latência constante em qualquer página).",
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Valor de next_cursor da página anterior. Implica pagination=cursor."
+    ),
+    count: str = Query(
+        "exact",
+        regex="^(exact|estimate|none)$",
+        description="Total: 'exact' (COUNT, com cache curto), 'estimate' (estimativa do planner) ou 'none' (não calcula).",
+    ),
+    fields: Optional[List[str]] = Query(
+        None,
+        description="Campos de cada item (ex.: ?fields=id,subject,date para omitir body). Pode repetir ou usar vírgula.",
+    ),
+    if_none_match: Optional[str] = Header(None),
+    email_service: EmailService = Depends(get_read_email_service),
 ):
     """
     Retorna a lista de e-mails, com opções de filtro, ordenação e paginação.
     """
+    keyset = pagination == "cursor" or cursor is not None
+    if keyset and sort == "relevance":
+        raise HTTPException(status_code=400, detail="Paginação por cursor exige sort=date.")
+    fields = _parse_fields(fields)
     logger.info("get_all_emails called")
     logger.debug(
         "filters: category=%s, initial_date=%s, end_date=%s, name=%s, order=%s, limit=%s, offset=%s",
@@ -78,41 +271,157 @@ async def get_all_emails(
         offset,
     )
 
-    emails, total = await email_service.get_all_emails(
-        category=category,
-        initial_date=initial_date,
-        end_date=end_date,
-        order=order,
-        limit=limit,
-        offset=offset,
-        name=name,
-    )
+    try:
+        page, etag = await email_service.get_all_emails(
+            category=category,
+            initial_date=initial_date,
+            end_date=end_date,
+            order=order,
+            limit=limit,
+            offset=offset,
+            name=name,
+            cursor=cursor,
+            keyset=keyset,
+            count=count,
+            search=search,
+            sort=sort,
+            fields=fields,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+    if etag is not None and if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
 
     logger.info(
-        "get_all_emails returning %d items (total=%d) [name=%s]",
-        len(emails) if emails else 0,
-        total,
+        "get_all_emails returning %d items (total=%s) [name=%s]",
+        len(page["items"]),
+        page["total"],
         name,
     )
 
-    return {"items": emails, "total": total} if not isinstance(emails, dict) else emails
+    # resposta montada direto com orjson, sem a validação/jsonable_encoder do response_model
+    return ORJSONResponse(page, headers={"ETag": etag} if etag else None)
+
+
+@router.get("/emails/export")
+async def export_all_emails(
+    category: Optional[List[str]] = Query(
+        None, description="Filtra por categoria. Pode repetir ou usar vírgula."
+    ),
+    initial_date: Optional[datetime] = Query(None, description="E-mails a partir desta data."),
+    end_date: Optional[datetime] = Query(None, description="E-mails até esta data."),
+    name: Optional[str] = Query(None, description="Busca em subject e body, como no GET /emails."),
+    search: str = Query("fulltext", regex="^(fulltext|substring)$"),
+    order: str = Query("asc", regex="^(asc|desc)$", description="Ordem por data."),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$", description="'ndjson' (um e-mail por linha) ou 'csv'."),
+    fields: Optional[List[str]] = Query(
+        None, description="Colunas exportadas; por padrão todas menos body. Pode repetir ou usar vírgula."
+    ),
+    compression: Optional[str] = Query(None, regex="^gzip$", description="'gzip' comprime o arquivo no envio."),
+):
+    """
+    Exporta todos os e-mails que casam com os filtros, sem paginação.
+    As linhas são lidas de um cursor no servidor e enviadas em blocos,
+    com memória constante qualquer que seja o volume.
+    """
+    fields = _parse_fields(fields)
+    logger.info("export_all_emails called format=%s compression=%s", format, compression)
+
+    filters = {
+        "category": category,
+        "initial_date": initial_date,
+        "end_date": end_date,
+        "order": order,
+        "name": name,
+        "search": search,
+    }
+    filename = f"emails.{format}" + (".gz" if compression else "")
+    return StreamingResponse(
+        export_emails(filters, fmt=format, fields=fields, compression=compression),
+        media_type="application/gzip" if compression else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
+@router.get("/emails/stats", response_model=EmailStatsOut)
+async def get_email_stats(
+    category: Optional[List[str]] = Query(
+        None, description="Restringe às categorias. Pode repetir ou usar vírgula."
+    ),
+    initial_date: Optional[datetime] = Query(None, description="Início do período (arredondado para a hora)."),
+    end_date: Optional[datetime] = Query(None, description="Fim do período."),
+    bucket: str = Query("hour", regex="^(hour|day)$", description="Granularidade do histograma (UTC)."),
+    top: int = Query(10, ge=1, le=100, description="Quantidade de categorias em top_categories."),
+    stats_service: StatsService = Depends(get_stats_service),
+):
+    """
+    Contagem de e-mails por categoria e hora/dia e as categorias com mais
+    e-mails, lidas do rollup email_stats_hourly (sem varrer emails).
+    """
+    logger.info("get_email_stats called bucket=%s", bucket)
+    stats = await stats_service.get_stats(category, initial_date, end_date, bucket=bucket, top=top)
+    return ORJSONResponse(stats)
 
-@router.get("/emails/{email_id}")
+
+@router.get("/emails/stream")
+async def stream_emails(
+    category: Optional[List[str]] = Query(
+        None, description="Recebe apenas estas categorias. Pode repetir ou usar vírgula."
+    ),
+    fields: Optional[List[str]] = Query(
+        None, description="Campos enviados em cada evento (id, subject, body, category, date, seq). Pode repetir ou usar vírgula."
+    ),
+    since: Optional[int] = Query(
+        None, description="Último seq recebido. O cabeçalho Last-Event-ID tem o mesmo efeito."
+    ),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Stream Server-Sent Events das notificações de e-mail, alimentado pelo
+    mesmo fan-out do WebSocket. O id de cada evento é o seq do e-mail.
+    """
+    if since is None and last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID inválido.")
+
+    fields = _parse_fields(fields, allowed=NOTIFICATION_FIELDS)
+
+    cats = [c for item in category or [] for c in item.split(",")]
+    client = await manager.connect_sse(since=since, categories=cats, fields=fields)
+
+    logger.info("stream_emails client connected since=%s", since)
+    return StreamingResponse(
+        client.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/emails/{email_id}", response_model=EmailOut)
 async def get_email_detail(
-    email_id: str, email_service: EmailService = Depends(get_email_service)
+    email_id: str,
+    if_none_match: Optional[str] = Header(None),
+    email_service: EmailService = Depends(get_read_email_service),
 ):
     """
     Busca um e-mail específico pelo seu ID.
+    Com If-None-Match igual ao ETag atual, responde 304 sem corpo.
     """
     logger.info("get_email_detail called id=%s", email_id)
 
-    email = await email_service.get_email_detail(email_id)
+    found = await email_service.get_email_detail(email_id)
 
-    if email is None:
+    if found is None:
         logger.warning("E-mail não encontrado id=%s", email_id)
         raise HTTPException(status_code=404, detail="E-mail não encontrado.")
 
+    email, etag = found
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
     logger.info("get_email_detail found id=%s", email_id)
 
-    return email
\ No newline at end of file
+    return ORJSONResponse(email, headers={"ETag": etag})
\ No newline at end of file
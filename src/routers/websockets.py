@@ -1,23 +1,91 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, WebSocketException, Query, status
+from typing import Optional, List
+import logging
+from pydantic import ValidationError
+from src.schemas.websockets import Subscription, NOTIFICATION_FIELDS
 from src.services.websockets import manager
 
+logger = logging.getLogger("inboxstream.routers.websockets")
+
 router = APIRouter(tags=["WebSockets"])
 
 @router.websocket("/websocket")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    since: Optional[int] = Query(None, description="Último seq recebido; reenvia as notificações perdidas."),
+    batch_ms: Optional[int] = Query(
+        None, ge=1, description="Modo lote: junta as notificações desta janela (ms) em um frame com array JSON."
+    ),
+    batch_max: Optional[int] = Query(None, ge=1, description="Modo lote: máximo de notificações por frame."),
+    compression: Optional[str] = Query(
+        None, regex="^deflate$", description="'deflate': frames binários com o array JSON comprimido (zlib)."
+    ),
+    category: Optional[List[str]] = Query(
+        None, description="Assinatura inicial: categorias de interesse. Pode repetir ou usar vírgula."
+    ),
+    keyword: Optional[str] = Query(None, description="Assinatura inicial: termo que o subject deve conter."),
+    fields: Optional[List[str]] = Query(
+        None, description="Assinatura inicial: campos de cada notificação. Pode repetir ou usar vírgula."
+    ),
+):
     """
     Endpoint WebSocket para clientes que desejam receber notificações de e-mail.
+
+    O cliente pode enviar a qualquer momento uma assinatura, por exemplo
+    {"action": "subscribe", "categories": ["Financeiro"], "fields": ["id", "subject"]},
+    para receber apenas as categorias e campos de interesse.
+
+    A assinatura inicial também pode ir na URL (?category=&keyword=&fields=),
+    com os mesmos campos da mensagem de subscribe.
+
+    Cada notificação traz `seq`; ao reconectar com ?since=<seq> o cliente
+    recebe primeiro as notificações perdidas, já filtradas e projetadas
+    pela assinatura inicial da URL. Se forem mais que
+    WS_REPLAY_MAX_MESSAGES, chega em seguida {"type": "resync",
+    "reason": "replay_truncated", "last_seq": N} e o cliente deve recarregar.
+
+    Para alto volume, ?batch_ms=50&batch_max=200 envia um array por frame
+    (latência extra de até batch_ms) e ?compression=deflate usa frames
+    binários comprimidos. A extensão permessage-deflate, quando oferecida
+    pelo cliente, é negociada pelo servidor (uvicorn) no handshake.
     """
-    await manager.connect(websocket)
-    print(f"Cliente conectado: {websocket.client}")
+    fields = [f.strip() for item in fields or [] for f in item.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in NOTIFICATION_FIELDS]
+    if unknown:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason=f"Campos desconhecidos: {', '.join(unknown)}."
+        )
+    await manager.connect(
+        websocket,
+        since=since,
+        batch_ms=batch_ms,
+        batch_max=batch_max,
+        compression=compression,
+        categories=[c for item in category or [] for c in item.split(",")],
+        keyword=keyword,
+        fields=fields,
+    )
+    logger.info("websocket connected client=%s", websocket.client)
     
     try:
         while True:
             data = await websocket.receive_text()
+            try:
+                subscription = Subscription.model_validate_json(data)
+            except ValidationError as e:
+                manager.send_to(websocket, {"type": "error", "detail": e.errors(include_url=False, include_context=False)})
+                continue
+            manager.subscribe(
+                websocket,
+                categories=subscription.categories,
+                keyword=subscription.keyword,
+                fields=subscription.fields,
+            )
+            manager.send_to(websocket, {"type": "subscribed", **subscription.model_dump(exclude={"action"})})
             
     except WebSocketDisconnect:
         manager.disconnect(websocket)
-        print(f"Cliente desconectado: {websocket.client}")
+        logger.info("websocket disconnected client=%s", websocket.client)
     except Exception as e:
         manager.disconnect(websocket)
-        print(f"Exceção no WebSocket: {e}")
\ No newline at end of file
+        logger.warning("websocket error client=%s: %s", websocket.client, e)
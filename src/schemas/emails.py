@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Literal, Any
 from datetime import datetime
 
 class Email(BaseModel):
@@ -9,5 +9,116 @@ class Email(BaseModel):
     id: str = Field(..., description="ID único do e-mail fornecido pelo sistema externo.")
     subject: str = Field(..., description="Assunto principal do e-mail.")
     body: Optional[str] = Field(None, description="Corpo do e-mail.")
-    category: str = Field("Geral", description="Categoria do e-mail.")
-    date: datetime = Field(..., description="Timestamp de quando o e-mail foi enviado pelo remetente.")
\ No newline at end of file
+    category: Optional[str] = Field(
+        None, description="Categoria do e-mail. Se omitida, é atribuída pelas regras de categorização."
+    )
+    date: datetime = Field(..., description="Timestamp de quando o e-mail foi enviado pelo remetente.")
+
+class BatchItemResult(BaseModel):
+    """
+    Resultado de um item do POST /emails:batch.
+    """
+    index: int = Field(..., description="Posição do item no lote recebido.")
+    id: Optional[str] = Field(None, description="ID do e-mail, quando disponível.")
+    status: Literal["accepted", "updated", "duplicate", "rejected"] = Field(
+        ..., description="Situação do item após a ingestão; 'updated' quando on_conflict=update sobrescreveu o e-mail."
+    )
+    errors: Optional[List[Any]] = Field(None, description="Erros de validação para itens rejeitados.")
+
+
+class BatchIngestResponse(BaseModel):
+    """
+    Resposta do POST /emails:batch com o status de cada item.
+    """
+    accepted: int
+    updated: int
+    duplicate: int
+    rejected: int
+    items: List[BatchItemResult]
+
+
+class EmailOut(BaseModel):
+    """
+    Schema de resposta de um e-mail. Na listagem com ?fields= apenas os
+    campos pedidos são enviados.
+    """
+    id: str
+    subject: Optional[str] = None
+    body: Optional[str] = Field(None, description="Corpo completo; na listagem só com ?fields=body.")
+    preview: Optional[str] = Field(None, description="Prévia em texto puro do corpo.")
+    category: Optional[str] = None
+    category_normalized: Optional[str] = None
+    date: Optional[datetime] = None
+    inserted_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    deleted_at: Optional[datetime] = None
+    seq: Optional[int] = None
+    snippet: Optional[str] = Field(None, description="Trecho destacado da busca full-text.")
+
+
+class EmailPage(BaseModel):
+    """
+    Resposta do GET /emails.
+    """
+    items: List[EmailOut]
+    total: Optional[int] = Field(None, description="Total de e-mails com os filtros; null com count=none.")
+    total_estimated: Optional[bool] = Field(None, description="Presente quando total é uma estimativa.")
+    next_cursor: Optional[str] = Field(None, description="Cursor da próxima página (pagination=cursor).")
+
+
+class StatsPoint(BaseModel):
+    """
+    Contagem de uma categoria em um período do GET /emails/stats.
+    """
+    bucket: datetime = Field(..., description="Início do período (UTC).")
+    category: str = Field(..., description="Categoria normalizada (minúsculas); vazia para e-mails sem categoria.")
+    count: int
+
+
+class CategoryTotal(BaseModel):
+    category: str
+    count: int
+
+
+class EmailStatsOut(BaseModel):
+    """
+    Resposta do GET /emails/stats, calculada sobre o rollup por hora.
+    """
+    bucket: Literal["hour", "day"]
+    total: int
+    series: List[StatsPoint]
+    top_categories: List[CategoryTotal]
+
+
+class BulkFilters(BaseModel):
+    """
+    Filtros das operações em massa, com o mesmo significado do GET /emails.
+    """
+    category: Optional[List[str]] = None
+    initial_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    name: Optional[str] = None
+    search: Literal["fulltext", "substring"] = "fulltext"
+    all: bool = Field(False, description="Obrigatório para aplicar a operação sem nenhum filtro.")
+
+    def is_empty(self) -> bool:
+        return not (self.category or self.initial_date or self.end_date or self.name)
+
+
+class BulkUpdateRequest(BaseModel):
+    """
+    Corpo do POST /emails:bulk-update.
+    """
+    filters: BulkFilters
+    category: str = Field(..., description="Nova categoria dos e-mails filtrados.")
+
+
+class BulkDeleteRequest(BaseModel):
+    """
+    Corpo do POST /emails:bulk-delete.
+    """
+    filters: BulkFilters
+
+
+class BulkResult(BaseModel):
+    affected: int = Field(..., description="Quantidade de e-mails alterados.")
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal, get_args
+
+# campos de cada notificação (ver ConnectionManager._serialize)
+NotificationField = Literal["id", "subject", "body", "category", "date", "seq"]
+NOTIFICATION_FIELDS = get_args(NotificationField)
+
+
+class Subscription(BaseModel):
+    """
+    Mensagem enviada pelo cliente no /websocket para escolher o que recebe.
+    Cada nova mensagem substitui a assinatura anterior.
+    """
+    action: Literal["subscribe"] = Field("subscribe", description="Tipo da mensagem.")
+    categories: Optional[List[str]] = Field(None, description="Categorias de interesse. Vazio ou ausente recebe todas.")
+    keyword: Optional[str] = Field(None, description="Só recebe e-mails cujo subject contenha este termo (case-insensitive).")
+    fields: Optional[List[NotificationField]] = Field(
+        None, description="Campos enviados em cada notificação. Ausente envia todos; seq sempre vai junto."
+    )
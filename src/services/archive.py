@@ -0,0 +1,73 @@
+from typing import Dict, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+
+from src.database.base import AsyncSessionLocal, use_maintenance_timeout
+from src.database.config import settings
+from src.repositories.emails import EmailRepository
+from src.services.cache import email_cache
+from src.services.websockets import manager
+
+logger = logging.getLogger("inboxstream.services.archive")
+
+
+async def _archive_all(batch_size: int, deleted_before: Optional[datetime] = None,
+                       date_before: Optional[datetime] = None) -> int:
+    """Move lotes de batch_size (uma transação cada) até não sobrar nada."""
+    moved = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            await use_maintenance_timeout(session)
+            ids = await EmailRepository(session).archive_batch(
+                batch_size, deleted_before=deleted_before, date_before=date_before
+            )
+        for email_id in ids:
+            email_cache.invalidate_detail(email_id)
+        moved += len(ids)
+        if len(ids) < batch_size:
+            return moved
+        # cede o event loop entre os lotes
+        await asyncio.sleep(0)
+
+
+async def run_compaction(now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Compactação da tabela quente: e-mails removidos há mais de
+    ARCHIVE_DELETED_GRACE_HOURS e, com ARCHIVE_AFTER_DAYS, e-mails ativos
+    mais antigos que isso vão para emails_archive em lotes de
+    ARCHIVE_BATCH_SIZE. As estatísticas não mudam: removidos já foram
+    descontados e os arquivados ativos continuam contados.
+    """
+    now = now or datetime.now(timezone.utc)
+    result = {
+        "deleted": await _archive_all(
+            settings.ARCHIVE_BATCH_SIZE,
+            deleted_before=now - timedelta(hours=settings.ARCHIVE_DELETED_GRACE_HOURS),
+        ),
+        "old": 0,
+    }
+    if settings.ARCHIVE_AFTER_DAYS:
+        result["old"] = await _archive_all(
+            settings.ARCHIVE_BATCH_SIZE, date_before=now - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+        )
+    if result["deleted"] or result["old"]:
+        email_cache.invalidate_all_lists()
+        await manager.publish_invalidation()
+        logger.info("archived %d deleted and %d old emails", result["deleted"], result["old"])
+    return result
+
+
+async def archive_loop():
+    """Tarefa de fundo iniciada no lifespan (ARCHIVE_ENABLED)."""
+    while True:
+        try:
+            await run_compaction()
+        except Exception:
+            logger.exception("archive compaction failed")
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    # Para rodar manualmente: python -m src.services.archive
+    print(asyncio.run(run_compaction()))
@@ -0,0 +1,225 @@
+from typing import List, Callable, Awaitable, Optional
+from datetime import datetime
+import asyncio
+import json
+import logging
+
+from sqlalchemy import select, func, text
+
+from src.database.base import engine, AsyncSessionLocal
+from src.database.config import settings
+from src.database.models import Email
+from src.repositories.emails import EmailRepository
+
+logger = logging.getLogger("inboxstream.services.backplane")
+
+Deliver = Callable[[List[str]], Awaitable[None]]
+
+
+class Backplane:
+    """
+    Canal de broadcast entre workers. `publish` é chamado uma vez por
+    mensagem no worker que despachou o outbox; cada worker recebe as mensagens
+    e as entrega aos próprios sockets através do callback `deliver`.
+    """
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def attach(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, json_strings: List[str]):
+        raise NotImplementedError
+
+    def queue_depth(self) -> int:
+        """Notificações recebidas e ainda não entregues aos sockets."""
+        return 0
+
+
+class InMemoryBackplane(Backplane):
+    """
+    Entrega direta no próprio processo. Adequado para um único worker e
+    para testes: sem perda, na ordem de publicação.
+    """
+    async def publish(self, json_strings: List[str]):
+        if self._deliver is not None:
+            await self._deliver(json_strings)
+
+
+class PostgresBackplane(Backplane):
+    """
+    Broadcast via LISTEN/NOTIFY do Postgres.
+
+    Ordem: o Postgres entrega as notificações de um canal na ordem de commit,
+    e cada worker as repassa aos sockets sequencialmente, então a ordem é a
+    mesma em todos os workers.
+
+    Garantias (BROADCAST_DELIVERY):
+     - "at_most_once": notificações emitidas enquanto a conexão LISTEN do
+       worker está caída são perdidas.
+     - "at_least_once": ao reconectar, o worker reenvia pelo índice de seq
+       os e-mails com seq acima do último recebido (menos uma margem de
+       BROADCAST_REPLAY_MARGIN_SEQS, para commits fora de ordem de seq), até
+       BROADCAST_REPLAY_MAX_MESSAGES; um cliente pode receber a mesma
+       mensagem mais de uma vez.
+
+    O payload do NOTIFY é limitado a ~8000 bytes; mensagens maiores são
+    publicadas como referência ({"_ref": id, "date": ...}) e cada worker
+    carrega a linha pela PK, lendo só a partição do mês.
+    """
+    MAX_PAYLOAD_BYTES = 7900
+
+    def __init__(
+        self,
+        channel: str,
+        delivery: str,
+        replay_margin_seqs: int,
+        replay_max_messages: int,
+        reconnect_delay_seconds: float = 1.0,
+    ):
+        super().__init__()
+        self.channel = channel
+        self.delivery = delivery
+        self.replay_margin = replay_margin_seqs
+        self.replay_max = replay_max_messages
+        self.reconnect_delay = reconnect_delay_seconds
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._listen_task: Optional[asyncio.Task] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
+        # maior seq recebido; ponto de partida do replay após uma queda
+        self._last_seq: Optional[int] = None
+        self._lost = False
+
+    async def start(self):
+        self._dispatch_task = asyncio.create_task(self._dispatch())
+        self._listen_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        for task in (self._listen_task, self._dispatch_task):
+            if task is not None:
+                task.cancel()
+        self._listen_task = self._dispatch_task = None
+
+    async def publish(self, json_strings: List[str]):
+        async with engine.begin() as conn:
+            for json_string in json_strings:
+                payload = json_string
+                if len(payload.encode()) > self.MAX_PAYLOAD_BYTES:
+                    data = json.loads(json_string)
+                    payload = json.dumps({"_ref": data["id"], "date": data["date"]})
+                await conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": payload},
+                )
+
+    async def _listen(self):
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    driver_conn = raw.driver_connection
+                    await driver_conn.add_listener(self.channel, self._on_notify)
+                    logger.info("backplane listening on channel %s", self.channel)
+                    if self.delivery == "at_least_once":
+                        if self._last_seq is None:
+                            self._last_seq = await self._max_seq()
+                        elif self._lost:
+                            await self._replay_after(self._last_seq - self.replay_margin)
+                    self._lost = False
+                    try:
+                        while not driver_conn.is_closed():
+                            await asyncio.sleep(self.reconnect_delay)
+                    finally:
+                        if not driver_conn.is_closed():
+                            await driver_conn.remove_listener(self.channel, self._on_notify)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("backplane listener connection lost")
+            self._lost = True
+            await asyncio.sleep(self.reconnect_delay)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._queue.put_nowait(payload)
+
+    async def _dispatch(self):
+        while True:
+            payload = await self._queue.get()
+            try:
+                if payload.startswith('{"_ref"'):
+                    ref = json.loads(payload)
+                    payload = await self._load_ref(ref["_ref"], datetime.fromisoformat(ref["date"]))
+                    if payload is None:
+                        continue
+                if self.delivery == "at_least_once":
+                    self._track_seq(json.loads(payload).get("seq"))
+                if self._deliver is not None:
+                    await self._deliver([payload])
+            except Exception:
+                logger.exception("backplane delivery failed")
+
+    def _track_seq(self, seq: Optional[int]):
+        if seq is not None and (self._last_seq is None or seq > self._last_seq):
+            self._last_seq = seq
+
+    async def _load_ref(self, email_id: str, date: datetime) -> Optional[str]:
+        async with AsyncSessionLocal() as session:
+            email = await EmailRepository(session).get_email_by_id(email_id, date=date)
+        return email_to_json(email) if email is not None else None
+
+    async def _max_seq(self) -> int:
+        async with AsyncSessionLocal() as session:
+            return await session.scalar(select(func.coalesce(func.max(Email.seq), 0)))
+
+    async def _replay_after(self, seq: int):
+        """Reenvia, em ordem de seq e em páginas, os e-mails com seq > `seq` (até replay_max)."""
+        replayed = 0
+        page_size = min(self.replay_max, 1000)
+        while replayed < self.replay_max:
+            limit = min(page_size, self.replay_max - replayed)
+            async with AsyncSessionLocal() as session:
+                emails = await EmailRepository(session).get_emails_since(seq, limit)
+            if not emails:
+                break
+            seq = emails[-1].seq
+            replayed += len(emails)
+            self._track_seq(seq)
+            if self._deliver is not None:
+                await self._deliver([email_to_json(email) for email in emails])
+            if len(emails) < limit:
+                break
+        else:
+            logger.warning("backplane replay stopped at %d emails (seq %d)", replayed, seq)
+        logger.info("backplane replayed %d emails after reconnect", replayed)
+
+
+def email_to_json(email: Email) -> str:
+    """Mesmo formato de ConnectionManager._serialize, a partir da linha do banco."""
+    return json.dumps({
+        "id": email.id,
+        "subject": email.subject,
+        "body": email.body,
+        "category": email.category,
+        "date": email.date.isoformat(),
+        "seq": email.seq,
+    })
+
+
+def create_backplane() -> Backplane:
+    if settings.BROADCAST_BACKPLANE == "postgres":
+        return PostgresBackplane(
+            channel=settings.BROADCAST_CHANNEL,
+            delivery=settings.BROADCAST_DELIVERY,
+            replay_margin_seqs=settings.BROADCAST_REPLAY_MARGIN_SEQS,
+            replay_max_messages=settings.BROADCAST_REPLAY_MAX_MESSAGES,
+        )
+    return InMemoryBackplane()
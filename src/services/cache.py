@@ -0,0 +1,304 @@
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import logging
+import time
+
+import orjson
+
+from src.database.config import settings
+
+logger = logging.getLogger("inboxstream.services.cache")
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    etag: str
+    size: int
+    expires_at: float
+
+
+class CacheBackend:
+    """
+    Interface de armazenamento do cache. O LRUCache guarda em memória, por
+    processo; um backend compartilhado (ex.: Redis) pode implementar os
+    mesmos métodos para que todos os workers vejam as mesmas entradas.
+
+    on_evict, quando definido, é chamado com a chave de cada entrada que o
+    backend descarta por conta própria (capacidade ou TTL).
+    """
+    on_evict: Optional[Callable[[Hashable], None]] = None
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, entry: CacheEntry):
+        raise NotImplementedError
+
+    def delete(self, key: Hashable):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class LRUCache(CacheBackend):
+    """LRU em memória limitado pelo total de bytes das entradas, com TTL."""
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at < time.monotonic():
+            if entry is not None:
+                self.delete(key)
+                self._evicted(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: Hashable, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+            self._evicted(evicted_key)
+
+    def _evicted(self, key: Hashable):
+        if self.on_evict is not None:
+            self.on_evict(key)
+
+    def delete(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def email_to_dict(email) -> Dict[str, Any]:
+    """
+    Campos de resposta de um e-mail: de uma linha do repositório (Row, já
+    projetada) ou de um Email do ORM (sem o tsvector de busca).
+    """
+    if hasattr(email, "_mapping"):
+        return dict(email._mapping)
+    return {
+        "id": email.id,
+        "subject": email.subject,
+        "body": email.body,
+        "preview": email.preview,
+        "category": email.category,
+        "category_normalized": email.category_normalized,
+        "date": email.date,
+        "inserted_at": email.inserted_at,
+        "updated_at": email.updated_at,
+        "deleted_at": email.deleted_at,
+        "seq": email.seq,
+    }
+
+
+def _encode(value: Any) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+
+
+def _ingest_summary(rows: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Resume um lote de e-mails em categoria -> [menor data, maior data], para
+    testar cada lista em cache uma vez por lote e não uma vez por e-mail.
+    """
+    summary: Dict[str, List[Any]] = {}
+    for row in rows:
+        date = row.get("date")
+        # None num dos extremos = intervalo aberto daquele lado
+        bounds = summary.setdefault((row.get("category") or "").lower(), [date, date])
+        try:
+            if bounds[0] is not None and (date is None or date < bounds[0]):
+                bounds[0] = date
+            if bounds[1] is not None and (date is None or date > bounds[1]):
+                bounds[1] = date
+        except TypeError:
+            # datas com e sem fuso não são comparáveis: intervalo aberto
+            bounds[0] = bounds[1] = None
+    return summary
+
+
+def _may_contain(filters: Dict[str, Any], summary: Dict[str, List[Any]]) -> bool:
+    """Se algum e-mail do lote (resumido por _ingest_summary) pode aparecer na listagem."""
+    if filters["categories"]:
+        ranges = [summary[c] for c in filters["categories"] if c in summary]
+    else:
+        ranges = list(summary.values())
+    for lowest, highest in ranges:
+        try:
+            if highest is not None and filters["initial_date"] and highest < filters["initial_date"]:
+                continue
+            if lowest is not None and filters["end_date"] and lowest > filters["end_date"]:
+                continue
+        except TypeError:
+            # datas com e sem fuso não são comparáveis: invalida por segurança
+            return True
+        return True
+    return False
+
+
+class EmailCache:
+    """
+    Cache read-through do detalhe (por id) e da primeira página das
+    listagens. O detalhe é populado na ingestão (write-through) e cada
+    entrada de lista só é invalidada quando um e-mail novo pode aparecer
+    nela (mesma categoria e dentro do intervalo de datas).
+
+    O índice de filtros das listas acompanha o backend: sai quando a entrada
+    é descartada ou expira e é limitado a max_lists (as mais antigas saem).
+
+    Com vários workers, cada um tem o seu cache: as notificações de e-mails
+    novos entregues pelo backplane (on_notify) e as mensagens de
+    invalidação das operações em massa (invalidate_all) chegam a todos.
+    """
+    def __init__(self, backend: CacheBackend, ttl_seconds: float, max_lists: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl_seconds
+        self.max_lists = max_lists
+        self.enabled = enabled
+        # filtros e expiração de cada lista em cache, para a invalidação seletiva
+        self._lists: "OrderedDict[Hashable, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        backend.on_evict = self._on_evict
+
+    def _on_evict(self, key: Hashable):
+        if isinstance(key, tuple) and key[0] == "list":
+            self._lists.pop(key[1], None)
+
+    def _entry(self, value: Any) -> CacheEntry:
+        raw = _encode(value)
+        etag = '"' + hashlib.blake2b(raw, digest_size=12).hexdigest() + '"'
+        return CacheEntry(value=value, etag=etag, size=len(raw), expires_at=time.monotonic() + self.ttl)
+
+    def get_detail(self, email_id: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        if not self.enabled:
+            return None
+        entry = self.backend.get(("email", email_id))
+        return (entry.value, entry.etag) if entry is not None else None
+
+    def put_detail(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        entry = self._entry(data)
+        if self.enabled:
+            self.backend.set(("email", data["id"]), entry)
+        return entry.value, entry.etag
+
+    def invalidate_detail(self, email_id: str):
+        self.backend.delete(("email", email_id))
+
+    def get_list(self, key: Hashable) -> Optional[Tuple[Dict[str, Any], str]]:
+        if not self.enabled:
+            return None
+        entry = self.backend.get(("list", key))
+        if entry is None:
+            self._lists.pop(key, None)
+            return None
+        return entry.value, entry.etag
+
+    def put_list(self, key: Hashable, filters: Dict[str, Any], response: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        entry = self._entry(response)
+        if self.enabled:
+            self.backend.set(("list", key), entry)
+            self._track_list(key, filters, entry.expires_at)
+        return entry.value, entry.etag
+
+    def _track_list(self, key: Hashable, filters: Dict[str, Any], expires_at: float):
+        self._lists[key] = (filters, expires_at)
+        self._lists.move_to_end(key)
+        while len(self._lists) > self.max_lists:
+            oldest, _ = self._lists.popitem(last=False)
+            self.backend.delete(("list", oldest))
+
+    def on_ingest(self, email_data: Dict[str, Any], detail: Optional[Dict[str, Any]] = None):
+        """Write-through do detalhe e invalidação das listas afetadas."""
+        if not self.enabled:
+            return
+        if detail is not None:
+            self.put_detail(detail)
+        else:
+            self.invalidate_detail(email_data["id"])
+        self._invalidate_lists([email_data])
+
+    def on_ingest_many(self, rows: List[Dict[str, Any]]):
+        """on_ingest de um lote: descarta os detalhes e percorre as listas uma única vez."""
+        if not self.enabled or not rows:
+            return
+        for row in rows:
+            self.invalidate_detail(row["id"])
+        self._invalidate_lists(rows)
+
+    def on_notify(self, rows: List[Dict[str, Any]]):
+        """
+        E-mails novos notificados pelo backplane, em todos os workers: como
+        on_ingest_many, mas mantém o detalhe gravado por write-through no
+        worker que fez a ingestão (mesmo seq).
+        """
+        if not self.enabled or not rows:
+            return
+        for row in rows:
+            entry = self.backend.get(("email", row["id"]))
+            if entry is not None and entry.value.get("seq") != row.get("seq"):
+                self.invalidate_detail(row["id"])
+        self._invalidate_lists(rows)
+
+    def _invalidate_lists(self, rows: List[Dict[str, Any]]):
+        summary = _ingest_summary(rows)
+        now = time.monotonic()
+        for key, (filters, expires_at) in list(self._lists.items()):
+            # listas expiradas saem do índice mesmo que o backend ainda não as tenha descartado
+            if expires_at < now or _may_contain(filters, summary):
+                self.backend.delete(("list", key))
+                del self._lists[key]
+
+    def invalidate_all_lists(self):
+        for key in list(self._lists):
+            self.backend.delete(("list", key))
+        self._lists.clear()
+
+    def invalidate_all(self):
+        """Descarta detalhes e listas (operações em massa, que alteram e-mails já em cache)."""
+        self.backend.clear()
+        self._lists.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "lists": len(self._lists), **self.backend.stats()}
+
+
+email_cache = EmailCache(
+    LRUCache(settings.CACHE_MAX_BYTES),
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+    max_lists=settings.CACHE_MAX_LISTS,
+    enabled=settings.CACHE_ENABLED,
+)
@@ -0,0 +1,255 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import importlib
+import json
+import logging
+import os
+import re
+import time
+
+from src.database.config import settings
+from src.metrics import CATEGORIZATION_SECONDS, EMAILS_CATEGORIZED
+
+logger = logging.getLogger("inboxstream.services.categorization")
+
+DEFAULT_CATEGORY = "Geral"
+WORD = re.compile(r"\w+")
+# peso de um acerto em cada campo: o assunto diz mais que o corpo
+FIELD_WEIGHTS = {"subject": 2, "body": 1}
+
+Classifier = Callable[[str, str], Optional[str]]
+
+
+class Categorizer:
+    """
+    Regras de categorização compiladas, com custo independente do número
+    de regras: o texto é tokenizado uma vez e as palavras-chave simples são
+    buscadas em um dict; as compostas ("nota fiscal") viram uma única regex
+    por campo, assim como os padrões, com um grupo nomeado por padrão.
+
+    Formato das regras (JSON):
+
+        {"default": "Geral",
+         "rules": [
+            {"category": "Financeiro", "keywords": ["fatura", "boleto"], "priority": 10},
+            {"category": "Suporte", "patterns": ["chamado\\\\s+#?\\\\d+"], "fields": ["subject"]}
+         ]}
+
+    Cada acerto soma o peso do campo (FIELD_WEIGHTS) à categoria da regra;
+    vence a maior pontuação e, no empate, a maior priority. Sem acertos, o
+    classificador opcional é consultado e, por fim, vale `default`.
+    """
+    def __init__(self, spec: Dict[str, Any], classifier: Optional[Classifier] = None, body_chars: int = 4000):
+        self.default = spec.get("default", DEFAULT_CATEGORY)
+        self.classifier = classifier
+        self.body_chars = body_chars
+        self.priority: Dict[str, int] = {}
+        # campo -> palavra -> categorias (palavras-chave de um único token)
+        self._words: Dict[str, Dict[str, List[str]]] = {}
+        # campo -> (regex das palavras-chave compostas, termo -> categorias)
+        self._phrases: Dict[str, Tuple[re.Pattern, Dict[str, List[str]]]] = {}
+        # campo -> (regex combinada, grupo -> categoria)
+        self._patterns: Dict[str, Tuple[re.Pattern, Dict[str, str]]] = {}
+
+        keywords: Dict[str, Dict[str, List[str]]] = {field: {} for field in FIELD_WEIGHTS}
+        patterns: Dict[str, List[Tuple[str, str, str]]] = {field: [] for field in FIELD_WEIGHTS}
+        for index, rule in enumerate(spec.get("rules", [])):
+            category = rule["category"]
+            self.priority[category] = max(self.priority.get(category, 0), rule.get("priority", 0))
+            for field in rule.get("fields", list(FIELD_WEIGHTS)):
+                for keyword in rule.get("keywords", []):
+                    keywords[field].setdefault(keyword.lower(), []).append(category)
+                for position, pattern in enumerate(rule.get("patterns", [])):
+                    patterns[field].append((f"r{index}_{position}", pattern, category))
+
+        for field in FIELD_WEIGHTS:
+            words = {k: v for k, v in keywords[field].items() if WORD.fullmatch(k)}
+            phrases = {k: v for k, v in keywords[field].items() if k not in words}
+            if words:
+                self._words[field] = words
+            if phrases:
+                # mais longas primeiro, para "nota fiscal extra" vencer "nota fiscal"
+                terms = sorted(phrases, key=len, reverse=True)
+                regex = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\b")
+                self._phrases[field] = (regex, phrases)
+            if patterns[field]:
+                regex = re.compile(
+                    "|".join(f"(?P<{group}>{pattern})" for group, pattern, _ in patterns[field]),
+                    re.IGNORECASE,
+                )
+                self._patterns[field] = (regex, {group: category for group, _, category in patterns[field]})
+
+    def categorize(self, subject: Optional[str], body: Optional[str]) -> Tuple[str, str]:
+        """Retorna (categoria, origem), origem em "rule", "classifier" ou "default"."""
+        texts = {"subject": subject or "", "body": (body or "")[:self.body_chars]}
+        scores: Dict[str, int] = {}
+        for field, text in texts.items():
+            if not text:
+                continue
+            weight = FIELD_WEIGHTS[field]
+            lowered = text.lower()
+            if field in self._words:
+                words = self._words[field]
+                for word, hits in Counter(WORD.findall(lowered)).items():
+                    for category in words.get(word, ()):
+                        scores[category] = scores.get(category, 0) + weight * hits
+            if field in self._phrases:
+                regex, phrases = self._phrases[field]
+                for match in regex.finditer(lowered):
+                    for category in phrases[match.group(0)]:
+                        scores[category] = scores.get(category, 0) + weight
+            if field in self._patterns:
+                regex, groups = self._patterns[field]
+                for match in regex.finditer(text):
+                    category = groups[match.lastgroup]
+                    scores[category] = scores.get(category, 0) + weight
+
+        if scores:
+            best = max(scores, key=lambda c: (scores[c], self.priority.get(c, 0)))
+            return best, "rule"
+        if self.classifier is not None:
+            predicted = self.classifier(texts["subject"], texts["body"])
+            if predicted:
+                return predicted, "classifier"
+        return self.default, "default"
+
+    def categorize_many(self, items: List[Tuple[Optional[str], Optional[str]]]) -> List[Tuple[str, str]]:
+        return [self.categorize(subject, body) for subject, body in items]
+
+
+def load_classifier(path: Optional[str]) -> Optional[Classifier]:
+    """Carrega "modulo:funcao"; a função recebe (subject, body) e retorna a categoria ou None."""
+    if not path:
+        return None
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+# cache por processo do pool: recompila só quando a versão das regras muda
+_worker_categorizer: Optional[Tuple[int, Categorizer]] = None
+
+
+def _categorize_in_worker(
+    version: int, spec: Dict[str, Any], classifier_path: Optional[str], body_chars: int,
+    items: List[Tuple[Optional[str], Optional[str]]],
+) -> List[Tuple[str, str]]:
+    global _worker_categorizer
+    if _worker_categorizer is None or _worker_categorizer[0] != version:
+        _worker_categorizer = (version, Categorizer(spec, load_classifier(classifier_path), body_chars))
+    return _worker_categorizer[1].categorize_many(items)
+
+
+class CategorizationEngine:
+    """
+    Etapa de categorização da ingestão. E-mails recebidos sem categoria
+    ganham uma pelas regras de CATEGORIZATION_RULES_PATH.
+
+    Nenhum lote trava o event loop: os maiores que CATEGORIZATION_POOL_MIN_BATCH
+    vão para um pool de CATEGORIZATION_WORKERS processos; os demais (ou todos,
+    sem pool) rodam no executor de threads do loop. Só lotes de até
+    CATEGORIZATION_INLINE_MAX_BATCH e-mails (centenas de microssegundos cada)
+    são classificados direto no loop, onde a troca de thread custaria mais.
+
+    O arquivo de regras é relido quando muda (a cada
+    CATEGORIZATION_RELOAD_SECONDS); regras inválidas são ignoradas e as
+    anteriores continuam valendo.
+    """
+    def __init__(
+        self,
+        rules_path: Optional[str],
+        classifier_path: Optional[str],
+        workers: int,
+        pool_min_batch: int,
+        reload_seconds: float,
+        body_chars: int,
+        inline_max_batch: int = 0,
+    ):
+        self.rules_path = rules_path
+        self.classifier_path = classifier_path
+        self.workers = workers
+        self.pool_min_batch = pool_min_batch
+        self.inline_max_batch = inline_max_batch
+        self.reload_seconds = reload_seconds
+        self.body_chars = body_chars
+        self.version = 0
+        self._spec: Dict[str, Any] = {"default": DEFAULT_CATEGORY, "rules": []}
+        self._categorizer = Categorizer(self._spec, load_classifier(classifier_path), body_chars)
+        self._mtime: Optional[float] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def reload(self) -> bool:
+        """Relê e compila as regras se o arquivo mudou. Retorna True se trocou."""
+        if not self.rules_path:
+            return False
+        try:
+            mtime = os.stat(self.rules_path).st_mtime
+            if mtime == self._mtime:
+                return False
+            with open(self.rules_path) as f:
+                spec = json.load(f)
+            categorizer = Categorizer(spec, load_classifier(self.classifier_path), self.body_chars)
+        except Exception:
+            logger.exception("could not load categorization rules from %s", self.rules_path)
+            return False
+        self._spec, self._categorizer, self._mtime = spec, categorizer, mtime
+        self.version += 1
+        logger.info("categorization rules loaded: %d rules (version %d)", len(spec.get("rules", [])), self.version)
+        return True
+
+    async def start(self):
+        self.reload()
+        if self.workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        if self.rules_path and self.reload_seconds > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_seconds)
+            self.reload()
+
+    async def categorize(self, rows: List[Dict[str, Any]]):
+        """Preenche `category` (in place) dos e-mails que chegaram sem ela."""
+        pending = [row for row in rows if not row.get("category")]
+        if not pending:
+            return
+        started = time.perf_counter()
+        items = [(row.get("subject"), row.get("body")) for row in pending]
+        loop = asyncio.get_running_loop()
+        if self._pool is not None and len(items) > self.pool_min_batch:
+            results = await loop.run_in_executor(
+                self._pool, _categorize_in_worker,
+                self.version, self._spec, self.classifier_path, self.body_chars, items,
+            )
+        elif len(items) > self.inline_max_batch:
+            # as regras compiladas não têm estado mutável: seguras para a thread
+            results = await loop.run_in_executor(None, self._categorizer.categorize_many, items)
+        else:
+            results = self._categorizer.categorize_many(items)
+
+        for row, (category, source) in zip(pending, results):
+            row["category"] = category
+            EMAILS_CATEGORIZED.labels(source).inc()
+        CATEGORIZATION_SECONDS.observe(time.perf_counter() - started)
+
+
+categorization_engine = CategorizationEngine(
+    rules_path=settings.CATEGORIZATION_RULES_PATH,
+    classifier_path=settings.CATEGORIZATION_CLASSIFIER,
+    workers=settings.CATEGORIZATION_WORKERS,
+    pool_min_batch=settings.CATEGORIZATION_POOL_MIN_BATCH,
+    reload_seconds=settings.CATEGORIZATION_RELOAD_SECONDS,
+    body_chars=settings.CATEGORIZATION_BODY_CHARS,
+    inline_max_batch=settings.CATEGORIZATION_INLINE_MAX_BATCH,
+)
@@ -1,15 +1,45 @@
 from typing import Optional, List, Tuple, Dict, Any
 from datetime import datetime
+import asyncio
+import base64
+import json
 
-from src.repositories.emails import EmailRepository
+from pydantic import ValidationError
+
+from src.repositories.emails import EmailRepository, email_key
 from src.database.models import Email
+from src.database.config import settings
+from src.schemas.emails import Email as EmailSchema
+from src.services.outbox import outbox_dispatcher
+from src.services.ingestion import ingestion_buffer, recent_ingests
+from src.services.cache import email_cache, email_to_dict
+from src.services.categorization import categorization_engine
 from src.services.websockets import manager
+from src.metrics import EMAILS_INGESTED
+from src.tracing import traced
+
+
+def encode_cursor(email: Email) -> str:
+    """Gera o cursor opaco (base64 de date + id) que aponta para após `email`."""
+    raw = json.dumps({"d": email.date.isoformat(), "id": email.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decodifica um cursor de encode_cursor. Levanta ValueError se inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["d"]), str(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("cursor inválido") from e
 
 
 class EmailService:
     def __init__(self, repository: EmailRepository):
         self.repo = repository
 
+    @traced("EmailService.get_all_emails")
     async def get_all_emails(
         self,
         category: Optional[List[str]],
@@ -19,10 +49,39 @@ class EmailService:
         limit: int,
         offset: int,
         name: Optional[str] = None,
-    ) -> Tuple[List[Email], int]:
+        cursor: Optional[str] = None,
+        keyset: bool = False,
+        count: str = "exact",
+        search: str = "fulltext",
+        sort: str = "date",
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
         """
-        Encaminha filtros para o repositório e retorna (items, total).
+        Encaminha filtros para o repositório e retorna (resposta, etag).
+        A resposta tem items e total; total_estimated com count="estimate" e
+        next_cursor na paginação por cursor (preenchido quando a página veio
+        completa). A primeira página é servida do cache quando possível;
+        etag é None para respostas que não passam pelo cache.
+
+        fields restringe as colunas selecionadas; id sempre vem, e date também
+        na paginação por cursor.
         """
+        if fields:
+            required = ["id", "date"] if keyset else ["id"]
+            fields = [*required, *(f for f in dict.fromkeys(fields) if f not in required)]
+        cats = sorted({c.strip().lower() for item in category or [] for c in item.split(",") if c.strip()})
+        cacheable = offset == 0 and cursor is None and limit <= settings.CACHE_LIST_MAX_LIMIT
+        if cacheable:
+            cache_key = (
+                tuple(cats), initial_date, end_date,
+                name.strip().lower() if name else None,
+                order, limit, keyset, count, search, sort,
+                tuple(fields) if fields else None,
+            )
+            cached = email_cache.get_list(cache_key)
+            if cached is not None:
+                return cached
+
         emails, total = await self.repo.get_filtered_emails(
             category=category,
             initial_date=initial_date,
@@ -31,17 +90,203 @@ class EmailService:
             limit=limit,
             offset=offset,
             name=name,
+            cursor=decode_cursor(cursor) if cursor else None,
+            keyset=keyset,
+            count=count,
+            search=search,
+            sort=sort,
+            fields=fields,
         )
 
-        return emails, total
+        response: Dict[str, Any] = {"items": [email_to_dict(e) for e in emails], "total": total}
+        if count == "estimate":
+            response["total_estimated"] = True
+        if keyset:
+            response["next_cursor"] = encode_cursor(emails[-1]) if len(emails) == limit else None
 
-    async def get_email_detail(self, email_id: str) -> Optional[Email]:
-        return await self.repo.get_email_by_id(email_id)
+        if cacheable:
+            filters = {"categories": set(cats), "initial_date": initial_date, "end_date": end_date}
+            return email_cache.put_list(cache_key, filters, response)
+        return response, None
 
-    async def ingest_email(self, email_data: Dict[str, Any]) -> Email:
+    @traced("EmailService.get_email_detail")
+    async def get_email_detail(self, email_id: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Retorna (email, etag) do cache ou do banco; None se não existe."""
+        cached = email_cache.get_detail(email_id)
+        if cached is not None:
+            return cached
+        email = await self.repo.get_email_by_id(email_id)
+        if email is None:
+            return None
+        return email_cache.put_detail(email_to_dict(email))
+
+    @traced("EmailService.ingest_email")
+    async def ingest_email(
+        self, email_data: Dict[str, Any], idempotency_key: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
         """
         email_data deve ser um dict com os campos do Email (ex.: result de model_dump()).
+
+        Idempotente por (id, date), a chave do ON CONFLICT: um reenvio não
+        grava nem notifica de novo e é respondido com a linha já gravada.
+        Retorna (e-mail, criado). Reenvios conhecidos pelo recent_ingests não
+        passam pelo INSERT; a linha vem do cache de detalhe ou de uma leitura
+        pela PK.
+
+        Com o buffer de ingestão ativo, o e-mail é gravado em grupo e o dict
+        é retornado após o commit do lote.
+        """
+        key = email_key(email_data["id"], email_data["date"])
+        if recent_ingests.lookup(key, idempotency_key) is not None:
+            stored = await self._stored_email(key)
+            if stored is not None:
+                EMAILS_INGESTED.labels("single", "duplicate").inc()
+                return stored, False
+
+        await categorization_engine.categorize([email_data])
+
+        if ingestion_buffer.running:
+            email, created = await ingestion_buffer.submit(email_data)
+        else:
+            row, created = await self.repo.create_email(email_data)
+            email = email_to_dict(row)
+            EMAILS_INGESTED.labels("single", "accepted" if created else "duplicate").inc()
+            if created:
+                email_cache.on_ingest(email_data, detail=email)
+                # a notificação foi para o outbox no mesmo commit
+                outbox_dispatcher.wake()
+
+        if email["seq"] is not None:
+            recent_ingests.remember(key, email["seq"], idempotency_key)
+        return email, created
+
+    async def _stored_email(self, key: Tuple[str, datetime]) -> Optional[Dict[str, Any]]:
+        """Linha gravada com esta chave: do cache de detalhe, se for a mesma, ou do banco."""
+        cached = email_cache.get_detail(key[0])
+        if cached is not None and email_key(cached[0]["id"], cached[0]["date"]) == key:
+            return cached[0]
+        row = await self.repo.get_email_by_id(key[0], include_deleted=True, date=key[1])
+        # None se a linha saiu da tabela (arquivada): o reenvio segue pelo INSERT
+        return email_to_dict(row) if row is not None else None
+
+    @traced("EmailService.ingest_emails_batch")
+    async def ingest_emails_batch(
+        self, raw_items: List[Any], on_conflict: str = "nothing"
+    ) -> Dict[str, Any]:
         """
-        await manager.broadcast(email_data)
-        new_email = await self.repo.create_email(email_data)
-        return new_email
\ No newline at end of file
+        Valida todos os itens do lote e grava os válidos com INSERTs
+        multi-linha; as notificações dos e-mails novos saem pelo outbox.
+
+        Cada item recebe um status: "accepted", "updated" (on_conflict="update"
+        sobrescreveu um e-mail existente), "duplicate" ou "rejected".
+        """
+        results: List[Dict[str, Any]] = []
+        rows: List[Dict[str, Any]] = []
+        row_index: Dict[Tuple[str, datetime], int] = {}
+
+        for index, raw in enumerate(raw_items):
+            try:
+                data = EmailSchema.model_validate(raw).model_dump()
+            except ValidationError as e:
+                raw_id = raw.get("id") if isinstance(raw, dict) else None
+                results.append({
+                    "index": index,
+                    "id": raw_id if isinstance(raw_id, str) else None,
+                    "status": "rejected",
+                    "errors": e.errors(include_url=False, include_context=False),
+                })
+                continue
+
+            # chaves repetidas no próprio lote, ou gravadas há pouco, contam como duplicadas
+            key = email_key(data["id"], data["date"])
+            if key in row_index or (
+                on_conflict == "nothing" and recent_ingests.lookup(key) is not None
+            ):
+                results.append({"index": index, "id": data["id"], "status": "duplicate"})
+                continue
+
+            row_index[key] = index
+            rows.append(data)
+            results.append({"index": index, "id": data["id"], "status": "accepted"})
+
+        await categorization_engine.categorize(rows)
+        written, updated = await self.repo.create_emails_bulk(
+            rows,
+            on_conflict=on_conflict,
+            chunk_size=settings.BATCH_INSERT_CHUNK_SIZE,
+        )
+
+        changed_rows = []
+        for row in rows:
+            key = email_key(row["id"], row["date"])
+            if key in written:
+                recent_ingests.remember(key, written[key])
+                changed_rows.append(row)
+            elif key in updated:
+                results[row_index[key]]["status"] = "updated"
+                changed_rows.append(row)
+            else:
+                results[row_index[key]]["status"] = "duplicate"
+        email_cache.on_ingest_many(changed_rows)
+
+        if written:
+            outbox_dispatcher.wake()
+        if updated:
+            # e-mails atualizados não geram notificação: os outros workers descartam o cache
+            await manager.publish_invalidation()
+
+        counts = {"accepted": 0, "updated": 0, "duplicate": 0, "rejected": 0}
+        for item in results:
+            counts[item["status"]] += 1
+        for status, count in counts.items():
+            if count:
+                EMAILS_INGESTED.labels("batch", status).inc(count)
+        return {**counts, "items": results}
+
+    async def _bulk(self, filters: Dict[str, Any], apply, remaining: Optional[List[Any]] = None) -> int:
+        """
+        Executa `apply` bloco a bloco até não sobrar linha que case com os filtros.
+
+        Os blocos pulam linhas travadas (SKIP LOCKED). Um bloco vazio só
+        encerra a operação se nenhuma linha casa mais com `remaining` (por
+        padrão, os filtros); senão as linhas estão travadas por outra
+        transação e o bloco é repetido com espera crescente; após
+        BULK_LOCKED_RETRIES tentativas, as passadas seguintes esperam os locks.
+        """
+        conditions = self.repo.bulk_conditions(**filters)
+        affected = 0
+        retries = 0
+        while True:
+            skip_locked = retries < settings.BULK_LOCKED_RETRIES
+            rows = await apply(conditions, settings.BULK_CHUNK_SIZE, skip_locked)
+            if rows:
+                retries = 0
+                affected += len(rows)
+                for row in rows:
+                    email_cache.invalidate_detail(row.id)
+                continue
+            if not await self.repo.has_matching(remaining or conditions):
+                break
+            if skip_locked:
+                await asyncio.sleep(settings.BULK_LOCKED_BACKOFF_MS * 2 ** retries / 1000)
+                retries += 1
+        if affected:
+            email_cache.invalidate_all_lists()
+            await manager.publish_invalidation()
+        return affected
+
+    @traced("EmailService.bulk_delete")
+    async def bulk_delete(self, filters: Dict[str, Any]) -> int:
+        """Remove (soft delete) todos os e-mails que casam com os filtros. Retorna quantos."""
+        return await self._bulk(filters, self.repo.soft_delete_chunk)
+
+    @traced("EmailService.bulk_recategorize")
+    async def bulk_recategorize(self, filters: Dict[str, Any], category: str) -> int:
+        """Troca a categoria de todos os e-mails que casam com os filtros. Retorna quantos."""
+        return await self._bulk(
+            filters,
+            lambda conditions, chunk_size, skip_locked: self.repo.recategorize_chunk(
+                conditions, category, chunk_size, skip_locked
+            ),
+            remaining=self.repo.recategorize_conditions(self.repo.bulk_conditions(**filters), category),
+        )
@@ -0,0 +1,258 @@
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import logging
+import time
+
+from src.database.base import AsyncSessionLocal
+from src.database.config import settings
+from src.repositories.emails import EmailRepository, EmailKey, email_key
+from src.services.outbox import outbox_dispatcher
+from src.services.cache import email_cache, email_to_dict
+from src.metrics import EMAILS_INGESTED
+
+logger = logging.getLogger("inboxstream.services.ingestion")
+
+
+class IngestionQueueFullError(Exception):
+    """O buffer de ingestão atingiu o limite e não aceita novos e-mails."""
+
+
+class IdempotencyKeyConflictError(Exception):
+    """A Idempotency-Key já foi usada com outro e-mail."""
+
+
+class RecentIngests:
+    """
+    LRU das chaves (id, date) gravadas recentemente (chave -> seq) e das
+    Idempotency-Keys recebidas (Idempotency-Key -> chave). Um reenvio
+    encontrado aqui não passa pelo INSERT; os demais são resolvidos pelo
+    ON CONFLICT (id, date), a mesma chave.
+
+    É por processo: em outro worker o reenvio cai no banco, que continua
+    sendo a garantia de idempotência.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[EmailKey, int]" = OrderedDict()
+        self._keys: "OrderedDict[str, EmailKey]" = OrderedDict()
+        self.hits = 0
+
+    def lookup(self, key: EmailKey, idempotency_key: Optional[str] = None) -> Optional[int]:
+        """seq do e-mail se já foi gravado; IdempotencyKeyConflictError se a Idempotency-Key é de outro e-mail."""
+        if idempotency_key is not None:
+            known = self._keys.get(idempotency_key)
+            if known is not None and known != key:
+                raise IdempotencyKeyConflictError(idempotency_key)
+        seq = self._ids.get(key)
+        if seq is not None:
+            self._ids.move_to_end(key)
+            self.hits += 1
+        return seq
+
+    def remember(self, key: EmailKey, seq: int, idempotency_key: Optional[str] = None):
+        self._put(self._ids, key, seq)
+        if idempotency_key is not None:
+            self._put(self._keys, idempotency_key, key)
+
+    def _put(self, entries: OrderedDict, key: Any, value: Any):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ids": len(self._ids), "keys": len(self._keys), "hits": self.hits}
+
+
+class IngestionBuffer:
+    """
+    Agrupa os POST /emails individuais e grava em uma única transação
+    (group commit) a cada max_wait_ms ou max_batch linhas, o que vier primeiro.
+    Cada chamador aguarda até a sua linha estar gravada no banco.
+    """
+    def __init__(self, max_wait_ms: float, max_batch: int, max_queue: int):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._accepting = False
+
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.rejected_full = 0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    async def start(self):
+        """Cria a fila e inicia a tarefa de flush (chamado no lifespan)."""
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._accepting = True
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "ingestion buffer started (max_wait=%.1fms max_batch=%d max_queue=%d)",
+            self.max_wait * 1000, self.max_batch, self.max_queue,
+        )
+
+    async def stop(self):
+        """Para de aceitar e-mails e grava tudo o que ainda estiver na fila."""
+        if self._task is None:
+            return
+        self._accepting = False
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("ingestion buffer drained")
+
+    async def submit(self, email_data: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Enfileira o e-mail e aguarda o commit do lote que o contém. Retorna
+        (e-mail com seq, criado); criado=False quando o id já existia.
+        Levanta IngestionQueueFullError quando a fila está cheia.
+        """
+        if not self._accepting:
+            raise IngestionQueueFullError()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((email_data, future))
+        except asyncio.QueueFull:
+            self.rejected_full += 1
+            EMAILS_INGESTED.labels("buffer", "rejected").inc()
+            raise IngestionQueueFullError()
+        return await future
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._accepting,
+            "queue_depth": self.queue_depth(),
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": self.rows_flushed / self.flushes if self.flushes else 0.0,
+            "last_flush_ms": self.last_flush_seconds * 1000,
+            "max_flush_ms": self.max_flush_seconds * 1000,
+            "avg_flush_ms": self.flush_seconds_total * 1000 / self.flushes if self.flushes else 0.0,
+            "rejected_full": self.rejected_full,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch: List[Tuple[Dict[str, Any], asyncio.Future]] = [item]
+
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+        # drena o que sobrou na fila após o sinal de parada
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.max_batch):
+            await self._flush(remaining[start:start + self.max_batch])
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        started = time.perf_counter()
+
+        rows: List[Dict[str, Any]] = []
+        keys: List[EmailKey] = []
+        seen = set()
+        for email_data, _ in batch:
+            key = email_key(email_data["id"], email_data["date"])
+            keys.append(key)
+            if key not in seen:
+                seen.add(key)
+                rows.append(email_data)
+
+        try:
+            async with AsyncSessionLocal() as session:
+                repo = EmailRepository(session)
+                written, _ = await repo.create_emails_bulk(rows, chunk_size=self.max_batch)
+                # reenvios respondem com a linha gravada, não com o payload recebido
+                existing = await repo.get_emails_by_ids([key[0] for key in seen if key not in written])
+        except Exception as e:
+            logger.exception("ingestion buffer flush failed (%d rows)", len(rows))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.rows_flushed += len(rows)
+        self.last_batch_size = len(rows)
+        self.max_batch_size = max(self.max_batch_size, len(rows))
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.flush_seconds_total += elapsed
+
+        duplicates = 0
+        claimed: Dict[EmailKey, Dict[str, Any]] = {}
+        created: List[Dict[str, Any]] = []
+        for (email_data, future), key in zip(batch, keys):
+            if future.done():
+                continue
+            seq = written.get(key)
+            if seq is not None and key not in claimed:
+                # só o primeiro envio de uma chave repetida no lote conta como novo
+                claimed[key] = {**email_data, "seq": seq}
+                created.append(email_data)
+                future.set_result((claimed[key], True))
+                continue
+            if key in claimed:
+                email = claimed[key]
+            elif key[0] in existing:
+                # mesma chave ou mesmo id com outra data: a linha dona do id
+                email = email_to_dict(existing[key[0]])
+            else:
+                # removida entre o INSERT e a leitura (ex.: arquivada): responde com o recebido
+                email = {**email_data, "seq": None}
+            future.set_result((email, False))
+            duplicates += 1
+
+        email_cache.on_ingest_many(created)
+        EMAILS_INGESTED.labels("buffer", "accepted").inc(len(claimed))
+        if duplicates:
+            EMAILS_INGESTED.labels("buffer", "duplicate").inc(duplicates)
+
+        if claimed:
+            outbox_dispatcher.wake()
+
+
+ingestion_buffer = IngestionBuffer(
+    max_wait_ms=settings.INGEST_BUFFER_MAX_WAIT_MS,
+    max_batch=settings.INGEST_BUFFER_MAX_BATCH,
+    max_queue=settings.INGEST_BUFFER_MAX_QUEUE,
+)
+
+recent_ingests = RecentIngests(settings.INGEST_RECENT_IDS_MAX)
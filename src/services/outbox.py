@@ -0,0 +1,114 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timezone
+import asyncio
+import logging
+
+from src.database.base import AsyncSessionLocal
+from src.database.config import settings
+from src.metrics import OUTBOX_DISPATCHED, OUTBOX_LAG_SECONDS
+from src.repositories.outbox import OutboxRepository
+from src.repositories.stats import StatsRepository, stats_key
+from src.services.websockets import manager
+
+logger = logging.getLogger("inboxstream.services.outbox")
+
+Sink = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class OutboxDispatcher:
+    """
+    Lê o outbox de notificações em lotes (OUTBOX_BATCH_SIZE) e entrega cada
+    lote aos sinks, por padrão o broadcast do ConnectionManager. O rollup
+    email_stats_hourly é atualizado na mesma transação.
+
+    A entrega é at-least-once: as linhas só são removidas depois que todos
+    os sinks aceitaram o lote, então uma queda no meio do caminho faz o lote
+    ser reenviado no próximo ciclo (ou por outro worker).
+
+    A ingestão chama wake() após o commit para a notificação sair sem
+    esperar o intervalo de polling, que cobre os commits de outros workers.
+    """
+    def __init__(self, batch_size: int, poll_interval_seconds: float, sinks: Optional[List[Sink]] = None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval_seconds
+        self.sinks: List[Sink] = sinks if sinks is not None else [manager.broadcast_many]
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # linhas não entregues continuam no outbox para o próximo start
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                dispatched = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("outbox dispatch failed")
+                dispatched = 0
+            if dispatched >= self.batch_size:
+                # ainda há acúmulo: segue sem esperar
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch_once(self) -> int:
+        """Entrega um lote do outbox. Retorna quantas linhas foram consumidas."""
+        async with AsyncSessionLocal() as session:
+            repo = OutboxRepository(session)
+            rows = await repo.claim_batch(self.batch_size)
+            if not rows:
+                return 0
+
+            messages = [
+                {
+                    "id": row.id,
+                    "subject": row.subject,
+                    "body": row.body,
+                    "category": row.category,
+                    "date": row.date,
+                    "seq": row.seq,
+                }
+                # e-mail removido ou arquivado antes da entrega: só descarta a notificação
+                for row in rows if row.id is not None and row.deleted_at is None
+            ]
+            if messages:
+                for sink in self.sinks:
+                    await sink(messages)
+
+            # rollup de estatísticas na mesma transação que consome o outbox:
+            # cada e-mail é somado exatamente uma vez, com a categoria atual
+            increments: Dict = {}
+            for row in rows:
+                if row.id is not None and row.deleted_at is None:
+                    key = stats_key(row.category, row.date)
+                    increments[key] = increments.get(key, 0) + 1
+            await StatsRepository(session).add(increments)
+
+            await repo.delete([row.outbox_id for row in rows])
+            await session.commit()
+
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            OUTBOX_LAG_SECONDS.observe(max((now - row.created_at).total_seconds(), 0.0))
+        OUTBOX_DISPATCHED.inc(len(rows))
+        return len(rows)
+
+
+outbox_dispatcher = OutboxDispatcher(
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval_seconds=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+)
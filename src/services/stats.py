@@ -0,0 +1,56 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import argparse
+import asyncio
+import logging
+
+from src.database.base import AsyncSessionLocal, use_maintenance_timeout
+from src.repositories.emails import EmailRepository
+from src.repositories.stats import StatsRepository
+from src.tracing import traced
+
+logger = logging.getLogger("inboxstream.services.stats")
+
+
+class StatsService:
+    def __init__(self, repository: StatsRepository):
+        self.repo = repository
+
+    @traced("StatsService.get_stats")
+    async def get_stats(
+        self,
+        category: Optional[List[str]],
+        initial_date: Optional[datetime],
+        end_date: Optional[datetime],
+        bucket: str = "hour",
+        top: int = 10,
+    ) -> Dict[str, Any]:
+        """Histograma por categoria e período e as categorias com mais e-mails."""
+        cats = EmailRepository._parse_categories(category)
+        series = await self.repo.histogram(cats, initial_date, end_date, bucket)
+        top_categories = await self.repo.top_categories(cats, initial_date, end_date, top)
+        points = [dict(row._mapping) for row in series]
+        return {
+            "bucket": bucket,
+            "total": sum(point["count"] for point in points),
+            "series": points,
+            "top_categories": [dict(row._mapping) for row in top_categories],
+        }
+
+
+async def rebuild(since: Optional[datetime] = None) -> int:
+    """Reconstrói o rollup (backfill) em uma transação."""
+    async with AsyncSessionLocal() as session:
+        await use_maintenance_timeout(session)
+        buckets = await StatsRepository(session).rebuild(since)
+        await session.commit()
+    logger.info("stats rollup rebuilt: %d buckets (since=%s)", buckets, since)
+    return buckets
+
+
+if __name__ == "__main__":
+    # Para reconstruir o rollup: python -m src.services.stats [--since 2026-01-01]
+    parser = argparse.ArgumentParser(description="Reconstrói email_stats_hourly a partir de emails.")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+    print(f"{asyncio.run(rebuild(args.since))} buckets")
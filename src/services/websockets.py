@@ -1,51 +1,567 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List
+from typing import List, Dict, Any, Optional, Set, FrozenSet, Deque, Tuple, Hashable, AsyncIterator
+from src.database.base import AsyncSessionLocal
+from src.database.config import settings
+from src.repositories.emails import EmailRepository
 from src.schemas.emails import Email as EmailSchema
+from src.services.backplane import Backplane, InMemoryBackplane, create_backplane, email_to_json
+from src.services.cache import email_cache
+from src.metrics import FANOUT_SECONDS, FANOUT_MESSAGES, FANOUT_DELIVERIES, SLOW_CONSUMERS, WS_FRAMES, WS_COMPRESSED_FRAMES
+from collections import deque, OrderedDict
+from datetime import datetime
+import asyncio
+import bisect
 import json
+import logging
+import time
+import zlib
+
+logger = logging.getLogger("inboxstream.services.websockets")
+
+# mensagem de controle do backplane: descarta o cache de leitura em todos os workers
+INVALIDATE = "cache_invalidate"
+
+
+class ClientConnection:
+    """
+    Cliente de notificações com fila de saída limitada. O broadcast só
+    enfileira (seq, payload já serializado), então um cliente lento não
+    atrasa a ingestão nem os demais clientes.
+
+    Política quando a fila está cheia (WS_SLOW_CONSUMER_POLICY):
+     - "drop_oldest": descarta a mensagem mais antiga da fila
+     - "disconnect": encerra a conexão do cliente
+     - "coalesce": descarta o acúmulo e enfileira um único aviso
+       {"type": "resync", "dropped": N} para o cliente recarregar via GET /emails
+    """
+    def __init__(self, manager: "ConnectionManager", queue_size: int, policy: str):
+        self.manager = manager
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+        # assinatura: None = sem filtro
+        self.categories: Optional[Set[str]] = None
+        self.keyword: Optional[str] = None
+        self.fields: Optional[FrozenSet[str]] = None
+
+    def matches(self, data: Dict[str, Any]) -> bool:
+        if self.keyword is None:
+            return True
+        return self.keyword in (data.get("subject") or "").lower()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def enqueue(self, json_string: str, seq: Optional[int] = None) -> bool:
+        """Enfileira sem bloquear. Retorna False se o cliente deve ser desconectado."""
+        try:
+            self.queue.put_nowait((seq, json_string))
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        self.dropped += 1
+        if self.policy == "disconnect":
+            return False
+        if self.policy == "coalesce":
+            skipped = 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                skipped += 1
+            self.queue.put_nowait((None, json.dumps({"type": "resync", "dropped": skipped})))
+            return True
+
+        self.queue.get_nowait()
+        self.queue.put_nowait((seq, json_string))
+        return True
+
+
+class WebSocketClient(ClientConnection):
+    """
+    Cliente WebSocket: uma tarefa própria esvazia a fila no socket.
+
+    Em modo lote (batch_window > 0), as mensagens que chegam dentro da
+    janela, até batch_max, vão juntas em um único frame com um array JSON;
+    os payloads já serializados são apenas concatenados. Com
+    compression="deflate" o array vai em um frame binário comprimido com
+    zlib (ver ConnectionManager.compress_frame). A latência extra fica
+    limitada a batch_window.
+    """
+    transport = "websocket"
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        manager: "ConnectionManager",
+        queue_size: int,
+        policy: str,
+        batch_window: float = 0.0,
+        batch_max: int = 1,
+        compression: Optional[str] = None,
+    ):
+        super().__init__(manager, queue_size, policy)
+        self.websocket = websocket
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.compression = compression
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def batching(self) -> bool:
+        return self.batch_window > 0 or self.compression is not None
+
+    def start(self):
+        self._task = asyncio.create_task(self._drain_batches() if self.batching else self._drain())
+
+    def stop(self):
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+    async def close(self):
+        try:
+            await self.websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def _drain(self):
+        try:
+            while True:
+                _, json_string = await self.queue.get()
+                await self.websocket.send_text(json_string)
+                WS_FRAMES.labels("single").inc()
+        except asyncio.CancelledError:
+            raise
+        except WebSocketDisconnect:
+            self.manager.disconnect(self.websocket)
+        except Exception as e:
+            logger.warning("send to websocket failed: %s", e)
+            self.manager.disconnect(self.websocket)
+
+    async def _next_batch(self) -> List[str]:
+        """Espera a primeira mensagem e junta as que chegarem na janela."""
+        loop = asyncio.get_running_loop()
+        _, first = await self.queue.get()
+        batch = [first]
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.batch_max:
+            try:
+                _, json_string = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    _, json_string = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(json_string)
+        return batch
+
+    async def _drain_batches(self):
+        try:
+            while True:
+                frame = "[" + ",".join(await self._next_batch()) + "]"
+                if self.compression == "deflate":
+                    await self.websocket.send_bytes(self.manager.compress_frame(frame))
+                else:
+                    await self.websocket.send_text(frame)
+                WS_FRAMES.labels("batch").inc()
+        except asyncio.CancelledError:
+            raise
+        except WebSocketDisconnect:
+            self.manager.disconnect(self.websocket)
+        except Exception as e:
+            logger.warning("send to websocket failed: %s", e)
+            self.manager.disconnect(self.websocket)
+
+
+class SSEClient(ClientConnection):
+    """
+    Cliente Server-Sent Events: a própria resposta HTTP consome a fila e
+    formata cada mensagem como evento (id = seq), com heartbeat periódico.
+    """
+    transport = "sse"
+
+    def __init__(self, manager: "ConnectionManager", queue_size: int, policy: str, heartbeat_seconds: float):
+        super().__init__(manager, queue_size, policy)
+        self.heartbeat = heartbeat_seconds
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+    async def events(self) -> AsyncIterator[str]:
+        try:
+            yield f"retry: {int(self.heartbeat * 1000)}\n\n"
+            while not self.closed:
+                try:
+                    seq, json_string = await asyncio.wait_for(self.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if seq is not None:
+                    yield f"id: {seq}\ndata: {json_string}\n\n"
+                else:
+                    yield f"data: {json_string}\n\n"
+        finally:
+            self.manager.disconnect(self)
+
 
 class ConnectionManager:
-    """Gerencia conexões WebSocket ativas e a transmissão de mensagens."""
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """
+    Gerencia conexões ativas (WebSocket e SSE) e a transmissão de mensagens.
+
+    broadcast publica a mensagem uma única vez no backplane; cada worker a
+    recebe do backplane e a enfileira para os sockets conectados nele.
+
+    Cada mensagem carrega o `seq` do e-mail. As últimas WS_REPLAY_BUFFER_SIZE
+    mensagens ficam em memória para o replay de clientes que reconectam com
+    ?since=<seq>; lacunas mais antigas são lidas do banco.
+    """
+    def __init__(self, backplane: Optional[Backplane] = None):
+        # chave: o WebSocket, ou o próprio SSEClient
+        self.active_connections: Dict[Hashable, ClientConnection] = {}
+        self.recent: Deque[Tuple[int, str]] = deque(maxlen=settings.WS_REPLAY_BUFFER_SIZE)
+        # índice de assinantes por categoria (minúscula) e dos que recebem todas
+        self.by_category: Dict[str, Set[Hashable]] = {}
+        self.all_categories: Set[Hashable] = set()
+        # frame JSON -> frame comprimido, compartilhado entre os clientes com compression=deflate
+        self.compressed_frames: "OrderedDict[str, bytes]" = OrderedDict()
+        self.backplane = backplane or InMemoryBackplane()
+        self.backplane.attach(self._send_to_all)
+
+    async def start(self):
+        await self.backplane.start()
+
+    async def stop(self):
+        await self.backplane.stop()
+        for client in list(self.active_connections.values()):
+            client.stop()
+            await client.close()
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        since: Optional[int] = None,
+        batch_ms: Optional[int] = None,
+        batch_max: Optional[int] = None,
+        compression: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        keyword: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ):
+        """
+        Aceita e adiciona uma nova conexão. Com `since`, enfileira antes as
+        mensagens com seq > since (até WS_REPLAY_MAX_MESSAGES); se havia mais,
+        segue um aviso {"type": "resync", "reason": "replay_truncated"}.
 
-    async def connect(self, websocket: WebSocket):
-        """Aceita e adiciona uma nova conexão."""
+        categories / keyword / fields são a assinatura inicial (como em
+        subscribe) e já valem para o replay.
+
+        batch_ms / batch_max / compression ativam o modo lote (limitados por
+        WS_BATCH_MAX_WINDOW_MS e WS_BATCH_MAX_MESSAGES); o primeiro elemento
+        do primeiro frame informa os valores efetivos ({"type": "session"}).
+        """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        batch_window = min(batch_ms or 0, settings.WS_BATCH_MAX_WINDOW_MS) / 1000
+        if batch_window and not batch_max:
+            batch_max = settings.WS_BATCH_DEFAULT_MESSAGES
+        client = WebSocketClient(
+            websocket,
+            self,
+            queue_size=settings.WS_SEND_QUEUE_SIZE,
+            policy=settings.WS_SLOW_CONSUMER_POLICY,
+            batch_window=batch_window,
+            batch_max=min(batch_max or 1, settings.WS_BATCH_MAX_MESSAGES),
+            compression=compression,
+        )
+        if client.batching:
+            client.enqueue(json.dumps({
+                "type": "session",
+                "batch_ms": int(client.batch_window * 1000),
+                "batch_max": client.batch_max,
+                "compression": client.compression,
+            }))
+        self._apply_subscription(client, categories, keyword, fields)
+        await self._register(websocket, client, since)
+
+    async def connect_sse(
+        self,
+        since: Optional[int] = None,
+        categories: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+    ) -> SSEClient:
+        """
+        Registra um cliente SSE já com a assinatura (categorias e campos),
+        que vale também para o replay; o chamador transmite client.events().
+        """
+        client = SSEClient(
+            self,
+            queue_size=settings.WS_SEND_QUEUE_SIZE,
+            policy=settings.WS_SLOW_CONSUMER_POLICY,
+            heartbeat_seconds=settings.SSE_HEARTBEAT_SECONDS,
+        )
+        self._apply_subscription(client, categories=categories, fields=fields)
+        await self._register(client, client, since)
+        return client
+
+    async def _register(self, key: Hashable, client: ClientConnection, since: Optional[int]):
+        limit = settings.WS_REPLAY_MAX_MESSAGES
+        replay: List[Tuple[int, str]] = []
+        if since is not None:
+            replay = await self._load_missed(since)
+
+        # daqui até o registro não há await: nada é perdido nem duplicado
+        # entre o replay e as mensagens ao vivo
+        last_seq = replay[-1][0] if replay else since
+        if since is not None and len(replay) <= limit:
+            replay.extend(self._recent_after(last_seq))
+        # o replay passa pelo mesmo filtro e projeção das mensagens ao vivo
+        for seq, json_string in replay[:limit]:
+            data = json.loads(json_string)
+            if self._wants(client, data):
+                client.enqueue(self._project(client, data, json_string, {}), seq)
+        if len(replay) > limit:
+            # a lacuna não coube no replay: o cliente deve recarregar via GET /emails
+            # (ou reconectar com since=last_seq) em vez de seguir com as mensagens ao vivo
+            client.enqueue(json.dumps({
+                "type": "resync", "reason": "replay_truncated", "last_seq": replay[limit - 1][0],
+            }))
 
-    def disconnect(self, websocket: WebSocket):
+        self.active_connections[key] = client
+        self._index(key, client)
+        client.start()
+
+    def _recent_after(self, seq: int) -> List[Tuple[int, str]]:
+        index = bisect.bisect_right(self.recent, (seq, chr(0x10FFFF)))
+        return list(self.recent)[index:]
+
+    async def _load_missed(self, since: int) -> List[Tuple[int, str]]:
+        """
+        Mensagens anteriores ao buffer em memória, lidas do banco. Lê uma
+        além de WS_REPLAY_MAX_MESSAGES para saber se o replay foi truncado.
+        """
+        if self.recent and self.recent[0][0] <= since + 1:
+            return []
+        async with AsyncSessionLocal() as session:
+            emails = await EmailRepository(session).get_emails_since(
+                since, settings.WS_REPLAY_MAX_MESSAGES + 1
+            )
+        return [(email.seq, email_to_json(email)) for email in emails]
+
+    def disconnect(self, key: Hashable):
         """Remove uma conexão desconectada."""
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(key, None)
+        if client is not None:
+            self._unindex(key, client)
+            client.stop()
+
+    def subscribe(
+        self,
+        key: Hashable,
+        categories: Optional[List[str]] = None,
+        keyword: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ):
+        """Substitui a assinatura da conexão, sem precisar reconectar."""
+        client = self.active_connections.get(key)
+        if client is None:
+            return
+        self._unindex(key, client)
+        self._apply_subscription(client, categories, keyword, fields)
+        self._index(key, client)
+
+    @staticmethod
+    def _apply_subscription(
+        client: ClientConnection,
+        categories: Optional[List[str]] = None,
+        keyword: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ):
+        cats = {c.strip().lower() for c in categories or [] if c.strip()}
+        client.categories = cats or None
+        client.keyword = keyword.strip().lower() if keyword and keyword.strip() else None
+        # seq vai sempre: é o que o cliente usa para retomar com ?since=
+        client.fields = frozenset([*fields, "seq"]) if fields else None
+
+    def _index(self, key: Hashable, client: ClientConnection):
+        if client.categories is None:
+            self.all_categories.add(key)
+        else:
+            for cat in client.categories:
+                self.by_category.setdefault(cat, set()).add(key)
+
+    def _unindex(self, key: Hashable, client: ClientConnection):
+        self.all_categories.discard(key)
+        for cat in client.categories or ():
+            subscribers = self.by_category.get(cat)
+            if subscribers is not None:
+                subscribers.discard(key)
+                if not subscribers:
+                    del self.by_category[cat]
+
+    def send_to(self, key: Hashable, data: Dict[str, Any]):
+        """Enfileira uma mensagem de controle para uma única conexão."""
+        client = self.active_connections.get(key)
+        if client is not None:
+            client.enqueue(json.dumps(data))
+
+    @staticmethod
+    def _serialize(message: Dict[str, Any]) -> str:
+        """Converte o dict do e-mail no JSON enviado aos clientes."""
+        data_to_send = {
+            "id": message.get("id", ""),
+            "subject": message.get("subject", ""),
+            "body": message.get("body", ""),
+            "category": message.get("category", ""),
+            "date": message.get("date", "").isoformat(),
+            "seq": message.get("seq"),
+        }
+        return json.dumps(data_to_send)
 
     async def broadcast(self, message: EmailSchema):
         """Envia uma mensagem para todos os clientes conectados."""
 
         try:
-            data_to_send = {
-                "id": message.get("id", ""),
-                "subject": message.get("subject", ""),
-                "body": message.get("body", ""),
-                "category": message.get("category", ""),
-                "date": message.get("date", "").isoformat()      
-            }
-
-            json_string = json.dumps(data_to_send)
+            json_string = self._serialize(message)
         except Exception as e:
-            print(f"Erro ao preparar mensagem para broadcast: {e}")
+            logger.error("could not serialize broadcast message: %s", e)
             return
-        disconnected_connections = []
-        for connection in self.active_connections:
+        await self.backplane.publish([json_string])
+
+    async def broadcast_many(self, messages: List[Dict[str, Any]]):
+        """
+        Envia várias mensagens em uma única passada pelas conexões ativas.
+        Cada mensagem é serializada uma única vez.
+        """
+        json_strings = []
+        for message in messages:
             try:
-                await connection.send(json_string)
-            except WebSocketDisconnect:
-                disconnected_connections.append(connection)
+                json_strings.append(self._serialize(message))
             except Exception as e:
-                print(f"Erro ao enviar para conexão: {e}")
-                disconnected_connections.append(connection)
+                logger.error("could not serialize broadcast message: %s", e)
+        if json_strings:
+            await self.backplane.publish(json_strings)
+
+    async def publish_invalidation(self):
+        """
+        Pede a todos os workers (inclusive este) que descartem o cache de
+        leitura: usado pelas operações que alteram e-mails já existentes sem
+        gerar notificação (operações em massa, upsert, compactação).
+        """
+        await self.backplane.publish([json.dumps({"type": INVALIDATE})])
+
+    async def _send_to_all(self, json_strings: List[str]):
+        """
+        Enfileira as mensagens (já serializadas) nos clientes cuja assinatura
+        casa com a categoria, sem aguardar o envio. Só os assinantes da
+        categoria e os sem filtro de categoria são visitados.
+
+        Cada worker recebe todas as notificações, e as usa também para
+        invalidar o próprio cache de leitura (detalhe e listas afetadas).
+        """
+        started = time.perf_counter()
+        deliveries = 0
+        slow_clients = set()
+        notified: List[Dict[str, Any]] = []
+        for json_string in json_strings:
+            data = json.loads(json_string)
+            if data.get("type") == INVALIDATE:
+                email_cache.invalidate_all()
+                continue
+            notified.append({
+                "id": data.get("id"),
+                "category": data.get("category"),
+                "date": datetime.fromisoformat(data["date"]) if data.get("date") else None,
+                "seq": data.get("seq"),
+            })
+            seq = data.get("seq")
+            if seq is not None:
+                self._remember(seq, json_string)
+            category = (data.get("category") or "").lower()
+            projections: Dict[FrozenSet[str], str] = {}
+
+            for key in self._subscribers_of(category):
+                client = self.active_connections.get(key)
+                if client is None or key in slow_clients or not client.matches(data):
+                    continue
+                payload = self._project(client, data, json_string, projections)
+                deliveries += 1
+                if not client.enqueue(payload, seq):
+                    slow_clients.add(key)
+
+        for key in slow_clients:
+            client = self.active_connections.get(key)
+            self.disconnect(key)
+            if client is not None:
+                # fechamento em segundo plano: o cliente lento não pode travar o broadcast
+                asyncio.create_task(client.close())
+
+        email_cache.on_notify(notified)
+        FANOUT_MESSAGES.inc(len(notified))
+        FANOUT_DELIVERIES.inc(deliveries)
+        if slow_clients:
+            SLOW_CONSUMERS.inc(len(slow_clients))
+        FANOUT_SECONDS.observe(time.perf_counter() - started)
+
+    def compress_frame(self, frame: str) -> bytes:
+        """
+        Comprime o frame de um lote. Clientes com a mesma assinatura recebem
+        o mesmo lote no mesmo broadcast, então o frame é comprimido uma vez e
+        reaproveitado pelos demais; WS_COMPRESSION_LEVEL baixo limita o custo
+        de cada compressão no event loop.
+        """
+        compressed = self.compressed_frames.get(frame)
+        if compressed is not None:
+            self.compressed_frames.move_to_end(frame)
+            WS_COMPRESSED_FRAMES.labels("shared").inc()
+            return compressed
+        compressed = zlib.compress(frame.encode(), settings.WS_COMPRESSION_LEVEL)
+        WS_COMPRESSED_FRAMES.labels("compressed").inc()
+        self.compressed_frames[frame] = compressed
+        while len(self.compressed_frames) > settings.WS_COMPRESSED_FRAME_CACHE_SIZE:
+            self.compressed_frames.popitem(last=False)
+        return compressed
+
+    @staticmethod
+    def _wants(client: ClientConnection, data: Dict[str, Any]) -> bool:
+        """Categoria e palavra-chave da assinatura (no envio ao vivo a categoria já vem do índice)."""
+        if client.categories is not None and (data.get("category") or "").lower() not in client.categories:
+            return False
+        return client.matches(data)
+
+    @staticmethod
+    def _project(
+        client: ClientConnection, data: Dict[str, Any], json_string: str, projections: Dict[FrozenSet[str], str]
+    ) -> str:
+        """Payload com os campos da assinatura; cada projeção é serializada uma vez por mensagem."""
+        if client.fields is None:
+            return json_string
+        payload = projections.get(client.fields)
+        if payload is None:
+            payload = json.dumps({k: v for k, v in data.items() if k in client.fields})
+            projections[client.fields] = payload
+        return payload
+
+    def _remember(self, seq: int, json_string: str):
+        # o backplane entrega em ordem de commit, que pode diferir da ordem de seq
+        if not self.recent or self.recent[-1][0] < seq:
+            self.recent.append((seq, json_string))
+        else:
+            entries = list(self.recent)
+            bisect.insort(entries, (seq, json_string))
+            self.recent = deque(entries, maxlen=self.recent.maxlen)
 
-        for connection in disconnected_connections:
-            if connection in self.active_connections:
-                self.active_connections.remove(connection)
+    def _subscribers_of(self, category: str) -> List[Hashable]:
+        return [*self.all_categories, *self.by_category.get(category, ())]
 
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager(create_backplane())
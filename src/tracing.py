@@ -0,0 +1,41 @@
+"""
+Spans OpenTelemetry opcionais em volta das chamadas de serviço e de
+repositório (TRACING_ENABLED). Sem o pacote opentelemetry-api instalado, ou
+com o tracing desligado, `traced` devolve a própria função, sem custo.
+
+O exportador é configurado fora da aplicação, por exemplo rodando com
+opentelemetry-instrument e as variáveis OTEL_EXPORTER_OTLP_*.
+"""
+from typing import Callable, TypeVar
+import functools
+import logging
+
+from src.database.config import settings
+
+logger = logging.getLogger("inboxstream.tracing")
+
+F = TypeVar("F", bound=Callable)
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+if settings.TRACING_ENABLED and trace is None:
+    logger.warning("TRACING_ENABLED is set but opentelemetry-api is not installed; tracing disabled")
+
+_tracer = trace.get_tracer("inboxstream") if settings.TRACING_ENABLED and trace is not None else None
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorador de corrotinas: abre um span `name` durante a chamada."""
+    def decorator(func: F) -> F:
+        if _tracer is None:
+            return func
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with _tracer.start_as_current_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
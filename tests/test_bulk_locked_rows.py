@@ -0,0 +1,95 @@
+"""
+Operações em massa com linhas travadas por outra transação (ex.: o FOR
+SHARE do dispatcher do outbox): o bloco pula as travadas, mas a operação só
+termina quando nenhuma linha casa mais com os filtros.
+
+Roda contra um Postgres já migrado, indicado por TEST_DATABASE_URL (ver
+test_list_query_plans.py); sem ela, o teste é pulado.
+"""
+from datetime import datetime, timezone
+import asyncio
+import os
+import uuid
+
+import pytest
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL não configurada")
+
+if DATABASE_URL:
+    pytest.importorskip("asyncpg")
+    pytest.importorskip("pydantic_settings")
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from src.repositories.emails import EmailRepository
+    from src.services.backplane import InMemoryBackplane
+    from src.services.emails import EmailService
+    from src.services.websockets import manager
+
+
+@pytest.fixture(autouse=True)
+def _local_backplane(monkeypatch):
+    # a invalidação do cache é publicada pelo manager global; o backplane
+    # padrão usaria o engine da aplicação, e não o banco de teste
+    monkeypatch.setattr(manager, "backplane", InMemoryBackplane())
+
+
+async def _bulk_with_locked_rows(operation: str):
+    engine = create_async_engine(DATABASE_URL)
+    category = f"teste-{uuid.uuid4().hex[:8]}"
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"id": f"{category}-{n}", "date": now, "subject": "s", "body": "b", "category": category}
+        for n in range(5)
+    ]
+    try:
+        async with AsyncSession(engine) as session:
+            await EmailRepository(session).create_emails_bulk(rows)
+
+        async with engine.connect() as locker:
+            # trava todas as linhas, como o claim_batch do dispatcher
+            await locker.execute(
+                text("SELECT id FROM emails WHERE category = :category FOR SHARE"), {"category": category}
+            )
+
+            async def release():
+                await asyncio.sleep(0.3)
+                await locker.rollback()
+
+            async with AsyncSession(engine) as session:
+                service = EmailService(EmailRepository(session))
+                filters = {"category": [category], "initial_date": None, "end_date": None}
+                if operation == "delete":
+                    affected, _ = await asyncio.gather(service.bulk_delete(filters), release())
+                else:
+                    # troca só de maiúsculas também é aplicada
+                    affected, _ = await asyncio.gather(
+                        service.bulk_recategorize(filters, category.upper()), release()
+                    )
+
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT category, deleted_at IS NOT NULL FROM emails WHERE category_normalized = :category"),
+                {"category": category},
+            )
+            return affected, result.all()
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM email_outbox WHERE email_id LIKE :prefix"), {"prefix": f"{category}-%"})
+            await conn.execute(text("DELETE FROM emails WHERE category_normalized = :category"), {"category": category})
+            await conn.execute(text("DELETE FROM email_stats_hourly WHERE category = :category"), {"category": category})
+        await engine.dispose()
+
+
+def test_bulk_delete_waits_for_locked_rows():
+    affected, rows = asyncio.run(_bulk_with_locked_rows("delete"))
+    assert affected == 5
+    assert all(deleted for _, deleted in rows)
+
+
+def test_bulk_recategorize_applies_case_only_change_to_locked_rows():
+    affected, rows = asyncio.run(_bulk_with_locked_rows("recategorize"))
+    assert affected == 5
+    assert {category for category, _ in rows} == {rows[0][0].upper()}
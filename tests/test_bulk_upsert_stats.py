@@ -0,0 +1,71 @@
+"""
+create_emails_bulk(on_conflict="update") que troca a categoria de e-mails
+já contados no rollup ajusta email_stats_hourly na mesma transação.
+
+Roda contra um Postgres já migrado, indicado por TEST_DATABASE_URL (ver
+test_list_query_plans.py); sem ela, o teste é pulado.
+"""
+from datetime import datetime, timezone
+import asyncio
+import os
+import uuid
+
+import pytest
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL não configurada")
+
+if DATABASE_URL:
+    pytest.importorskip("asyncpg")
+    pytest.importorskip("pydantic_settings")
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from src.repositories.emails import EmailRepository
+    from src.repositories.stats import StatsRepository, stats_key
+
+
+async def _recategorize_by_upsert():
+    engine = create_async_engine(DATABASE_URL)
+    prefix = f"upsert-{uuid.uuid4().hex[:8]}"
+    before, after = f"{prefix}-antes", f"{prefix}-depois"
+    date = datetime.now(timezone.utc)
+    rows = [
+        {"id": f"{prefix}-{n}", "date": date, "subject": "s", "body": "b", "category": before}
+        for n in range(3)
+    ]
+    try:
+        async with AsyncSession(engine) as session:
+            await EmailRepository(session).create_emails_bulk(rows)
+            # o que o dispatcher faria: conta as linhas e remove as notificações
+            await session.execute(text("DELETE FROM email_outbox WHERE email_id LIKE :prefix"), {"prefix": f"{prefix}-%"})
+            await StatsRepository(session).add({stats_key(before, date): len(rows)})
+            await session.commit()
+
+        async with AsyncSession(engine) as session:
+            written, updated = await EmailRepository(session).create_emails_bulk(
+                [{**row, "category": after} for row in rows], on_conflict="update"
+            )
+
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT category, count FROM email_stats_hourly WHERE category LIKE :prefix"),
+                {"prefix": f"{prefix}-%"},
+            )
+            return written, updated, dict(result.all())
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM email_outbox WHERE email_id LIKE :prefix"), {"prefix": f"{prefix}-%"})
+            await conn.execute(text("DELETE FROM emails WHERE id LIKE :prefix"), {"prefix": f"{prefix}-%"})
+            await conn.execute(text("DELETE FROM email_ids WHERE id LIKE :prefix"), {"prefix": f"{prefix}-%"})
+            await conn.execute(text("DELETE FROM email_stats_hourly WHERE category LIKE :prefix"), {"prefix": f"{prefix}-%"})
+        await engine.dispose()
+
+
+def test_upsert_moves_rollup_counts_to_the_new_category():
+    written, updated, counts = asyncio.run(_recategorize_by_upsert())
+    assert written == {}
+    assert len(updated) == 3
+    assert sorted(counts.values()) == [0, 3]
+    assert [category for category, count in counts.items() if count == 3][0].endswith("-depois")
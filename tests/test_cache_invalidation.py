@@ -0,0 +1,59 @@
+"""
+Invalidação do cache de leitura em todos os workers: cada worker recebe
+as notificações do backplane em ConnectionManager._send_to_all e descarta o
+que a ingestão feita em outro worker tornou obsoleto.
+"""
+from datetime import datetime, timezone
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("asyncpg")
+pytest.importorskip("pydantic_settings")
+
+from src.services.cache import email_cache
+from src.services.websockets import ConnectionManager
+
+DATE = datetime(2025, 1, 10, tzinfo=timezone.utc)
+
+
+def _notification(email_id: str, category: str, seq: int) -> str:
+    return json.dumps({
+        "id": email_id, "subject": "s", "body": "b", "category": category, "date": DATE.isoformat(), "seq": seq,
+    })
+
+
+def _fill_cache():
+    email_cache.invalidate_all()
+    email_cache.put_detail({"id": "a", "category": "Financeiro", "date": DATE, "seq": 1})
+    email_cache.put_detail({"id": "b", "category": "Suporte", "date": DATE, "seq": 2})
+    for category in ("financeiro", "suporte"):
+        filters = {"categories": {category}, "initial_date": None, "end_date": None}
+        email_cache.put_list(("lista", category), filters, {"items": [], "total": 0})
+
+
+def test_notification_invalidates_detail_and_affected_lists():
+    _fill_cache()
+    # "a" foi regravado em outro worker (outro seq); "b" é o write-through deste worker
+    notifications = [_notification("a", "Financeiro", 3), _notification("b", "Suporte", 2)]
+    asyncio.run(ConnectionManager()._send_to_all(notifications))
+    assert email_cache.get_detail("a") is None
+    assert email_cache.get_detail("b") is not None
+    assert email_cache.get_list(("lista", "financeiro")) is None
+    assert email_cache.get_list(("lista", "suporte")) is None
+
+
+def test_unrelated_list_survives_notification():
+    _fill_cache()
+    asyncio.run(ConnectionManager()._send_to_all([_notification("c", "Financeiro", 4)]))
+    assert email_cache.get_list(("lista", "suporte")) is not None
+
+
+def test_invalidation_message_clears_every_worker_cache():
+    _fill_cache()
+    manager = ConnectionManager()
+    asyncio.run(manager.publish_invalidation())
+    assert email_cache.get_detail("a") is None
+    assert email_cache.get_list(("lista", "suporte")) is None
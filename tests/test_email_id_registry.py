@@ -0,0 +1,90 @@
+"""
+Unicidade do id em emails (particionada por date, PK (id, date)): um
+reenvio com o mesmo id e outra data não cria uma segunda linha, e o
+arquivamento libera o id.
+
+Roda contra um Postgres já migrado, indicado por TEST_DATABASE_URL (ver
+test_list_query_plans.py); sem ela, os testes são pulados.
+"""
+from datetime import datetime, timedelta, timezone
+import asyncio
+import os
+import uuid
+
+import pytest
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL não configurada")
+
+if DATABASE_URL:
+    pytest.importorskip("asyncpg")
+    pytest.importorskip("pydantic_settings")
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from src.repositories.emails import EmailRepository
+
+
+def _email(email_id: str, date: datetime, subject: str = "s") -> dict:
+    return {"id": email_id, "date": date, "subject": subject, "body": "b", "category": "teste-registro"}
+
+
+async def _with_repo(scenario):
+    engine = create_async_engine(DATABASE_URL)
+    email_id = f"registro-{uuid.uuid4().hex[:8]}"
+    try:
+        return await scenario(engine, email_id)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM email_outbox WHERE email_id = :id"), {"id": email_id})
+            for table in ("emails", "emails_archive", "email_ids"):
+                await conn.execute(text(f"DELETE FROM {table} WHERE id = :id"), {"id": email_id})
+        await engine.dispose()
+
+
+async def _count(engine, email_id: str) -> int:
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT count(*) FROM emails WHERE id = :id"), {"id": email_id})
+        return result.scalar_one()
+
+
+def test_same_id_with_another_date_is_a_duplicate():
+    now = datetime.now(timezone.utc)
+
+    async def scenario(engine, email_id):
+        async with AsyncSession(engine) as session:
+            repo = EmailRepository(session)
+            first, created = await repo.create_email(_email(email_id, now, "original"))
+            assert created
+            again, created = await repo.create_email(_email(email_id, now - timedelta(days=1), "outra data"))
+            assert not created
+            assert (again.date, again.subject) == (first.date, "original")
+            written, updated = await repo.create_emails_bulk(
+                [_email(email_id, now - timedelta(days=2), "lote")], on_conflict="update"
+            )
+            assert written == {} and updated == set()
+            assert (await repo.get_email_by_id(email_id)).subject == "original"
+        return await _count(engine, email_id)
+
+    assert asyncio.run(_with_repo(scenario)) == 1
+
+
+def test_archiving_releases_the_id():
+    old = datetime.now(timezone.utc) - timedelta(days=1)
+
+    async def scenario(engine, email_id):
+        async with AsyncSession(engine) as session:
+            repo = EmailRepository(session)
+            await repo.create_email(_email(email_id, old))
+            await session.execute(
+                text("UPDATE emails SET deleted_at = now() - interval '1 hour' WHERE id = :id"), {"id": email_id}
+            )
+            await session.commit()
+            moved = await repo.archive_batch(1000, deleted_before=datetime.now(timezone.utc))
+            assert email_id in moved
+            _, created = await repo.create_email(_email(email_id, old + timedelta(hours=1)))
+            assert created
+        return await _count(engine, email_id)
+
+    assert asyncio.run(_with_repo(scenario)) == 1
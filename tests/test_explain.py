@@ -0,0 +1,31 @@
+"""
+EXPLAIN da listagem compilado sem banco: a busca full-text passa o
+REGCONFIG como parâmetro, que literal_binds não sabe renderizar.
+"""
+import pytest
+
+pytest.importorskip("asyncpg")
+pytest.importorskip("pydantic_settings")
+
+from sqlalchemy.dialects.postgresql import asyncpg as pg_asyncpg
+
+from src.repositories.emails import EmailRepository, Explain
+
+
+def _compile(**filters):
+    args = {"cats": [], "initial_date": None, "end_date": None, "order": "desc", "limit": 20, "offset": 0}
+    stmt, _ = EmailRepository(None).list_statement(**{**args, **filters})
+    return Explain(stmt).compile(dialect=pg_asyncpg.dialect())
+
+
+def test_explain_compiles_fulltext_statement():
+    compiled = _compile(name="fatura", sort="relevance")
+    sql = str(compiled)
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "websearch_to_tsquery" in sql
+    assert "fatura" in compiled.params.values()
+
+
+def test_explain_compiles_category_statement():
+    compiled = _compile(cats=["Financeiro"])
+    assert "category_normalized IN" in str(compiled)
@@ -0,0 +1,75 @@
+"""
+Replay de notificações (?since= / Last-Event-ID): as mensagens reenviadas
+passam pelo mesmo filtro de categoria e projeção de campos do envio ao vivo.
+"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("asyncpg")
+pytest.importorskip("pydantic_settings")
+
+from src.services.websockets import ConnectionManager
+
+
+def _message(seq: int, category: str) -> str:
+    return json.dumps({
+        "id": f"e{seq}", "subject": "s", "body": "corpo", "category": category,
+        "date": "2025-01-01T00:00:00+00:00", "seq": seq,
+    })
+
+
+def _drain(client):
+    items = []
+    while not client.queue.empty():
+        items.append(client.queue.get_nowait())
+    return items
+
+
+class FakeWebSocket:
+    async def accept(self):
+        pass
+
+
+def _manager() -> ConnectionManager:
+    manager = ConnectionManager()
+    for seq, category in enumerate(["Financeiro", "Suporte", "Financeiro", "Suporte"], start=1):
+        manager._remember(seq, _message(seq, category))
+    return manager
+
+
+async def _replayed(**subscription):
+    client = await _manager().connect_sse(since=0, **subscription)
+    return _drain(client)
+
+
+async def _replayed_websocket(**subscription):
+    manager = _manager()
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, since=0, **subscription)
+    client = manager.active_connections[websocket]
+    items = _drain(client)
+    client.stop()
+    return items
+
+
+def test_sse_replay_applies_category_and_fields():
+    items = asyncio.run(_replayed(categories=["suporte"], fields=["id"]))
+    assert [seq for seq, _ in items] == [2, 4]
+    assert [json.loads(payload) for _, payload in items] == [{"id": "e2", "seq": 2}, {"id": "e4", "seq": 4}]
+
+
+def test_sse_replay_without_subscription_sends_everything():
+    items = asyncio.run(_replayed())
+    assert [seq for seq, _ in items] == [1, 2, 3, 4]
+    assert json.loads(items[0][1])["body"] == "corpo"
+
+
+def test_websocket_replay_applies_initial_subscription():
+    items = asyncio.run(_replayed_websocket(categories=["Financeiro"], fields=["id", "category"]))
+    assert [json.loads(payload) for _, payload in items] == [
+        {"id": "e1", "category": "Financeiro", "seq": 1},
+        {"id": "e3", "category": "Financeiro", "seq": 3},
+    ]